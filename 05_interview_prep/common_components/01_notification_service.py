@@ -1,6 +1,14 @@
 # 01_notification_service.py
+import collections
+import os
+import pickle
 import queue
+import random
+import struct
+import tempfile
+import threading
 import time
+import tracemalloc
 
 # ==========================================
 # 📢 NOTIFICATION SYSTEM (Pub/Sub)
@@ -9,36 +17,508 @@ import time
 # Sending sequentially takes forever.
 # Solution: Fan-out Queues.
 
-class NotificationExchange:
+# ==========================================
+# 🔀 TOPIC ROUTING (Wildcard Subscriptions in a Trie)
+# ==========================================
+# PROBLEM: Fan-out to EVERY queue means SMS gets "user.42.avatar_changed"
+# too. Filtering with a list of patterns means checking all 100,000
+# subscriptions on every publish.
+#
+# FIX: Topics are dot-separated words ("user.42.registered"). Subscriptions
+# use RabbitMQ-style wildcards:
+#   *  = exactly one word     "user.*.registered"
+#   #  = zero or more words   "user.#"
+# Store the patterns word by word in a trie, built once at subscribe time.
+# Publish walks the topic's words down the trie (literal child, '*' child,
+# '#' child). Cost depends on topic length and how many patterns MATCH,
+# not on how many subscriptions exist.
+
+class _TopicNode:
+    __slots__ = ("children", "subscribers")
+
+    def __init__(self):
+        self.children = {} # word (or '*' / '#') -> _TopicNode
+        self.subscribers = set()
+
+class TopicRouter:
     def __init__(self):
-        self.queues = {
-            "email": queue.Queue(),
-            "sms": queue.Queue(),
-            "push": queue.Queue()
-        }
-        
-    def publish(self, msg):
-        print(f"📢 [Publisher] Fan-out event: '{msg}'")
-        for q_name, q in self.queues.items():
-            q.put(msg)
-            print(f"   -> Enqueued to {q_name}")
+        self.root = _TopicNode()
+
+    def subscribe(self, pattern, subscriber):
+        node = self.root
+        for word in pattern.split("."):
+            node = node.children.setdefault(word, _TopicNode())
+        node.subscribers.add(subscriber)
+
+    def unsubscribe(self, pattern, subscriber):
+        node = self.root
+        path = [] # (parent, word) pairs, so empty nodes can be pruned on the way back up
+        for word in pattern.split("."):
+            path.append((node, word))
+            node = node.children.get(word)
+            if node is None:
+                return False
+        if subscriber not in node.subscribers:
+            return False
+        node.subscribers.discard(subscriber)
+        # Per-entity patterns ("order.<id>.shipped") come and go: don't leave dead branches behind
+        for parent, word in reversed(path):
+            child = parent.children[word]
+            if child.subscribers or child.children:
+                break
+            del parent.children[word]
+        return True
+
+    def match(self, topic):
+        words = topic.split(".")
+        found = set()
+        stack = [(self.root, 0)]
+        while stack:
+            node, i = stack.pop()
+            wild = node.children.get("#")
+            if wild is not None:
+                stack.extend((wild, j) for j in range(i, len(words) + 1)) # Swallow 0..all remaining words
+            if i == len(words):
+                found |= node.subscribers
+                continue
+            for key in (words[i], "*"):
+                child = node.children.get(key)
+                if child is not None:
+                    stack.append((child, i + 1))
+        return found
+
+class PartialDelivery(queue.Full):
+    # A channel stayed full mid fan-out. Queues already holding the message keep it
+    # (no un-put on a queue), so the caller learns exactly which channels still need it.
+    def __init__(self, delivered, missed):
+        super().__init__(f"delivered to {delivered}, still full: {missed}")
+        self.delivered, self.missed = delivered, missed
+
+class NotificationExchange:
+    def __init__(self, channels=("email", "sms", "push"), maxsize=0, verbose=True, queue_factory=None):
+        # maxsize > 0 = bounded queues: publish() blocks while a channel is full (backpressure)
+        # queue_factory(channel) -> queue, e.g. a SpillQueue per channel
+        self.queue_factory = queue_factory or (lambda name: queue.Queue(maxsize))
+        self.queues = {name: self.queue_factory(name) for name in channels}
+        self.router = TopicRouter()
+        self.verbose = verbose
+
+    def subscribe(self, pattern, channel):
+        if channel not in self.queues:
+            self.queues[channel] = self.queue_factory(channel)
+        self.router.subscribe(pattern, channel)
+
+    def publish(self, msg, timeout=None, topic=None):
+        # No topic: the original fan-out to every channel. Returns the channels that got it.
+        # A channel full past `timeout` raises PartialDelivery (a queue.Full) listing the
+        # delivered and missed channels: retry publish_to(e.missed), not the whole fan-out.
+        targets = list(self.queues) if topic is None else sorted(self.router.match(topic))
+        if self.verbose:
+            print(f"📢 [Publisher] Fan-out event: '{msg}'" + (f" on '{topic}'" if topic else ""))
+            if not targets:
+                print("   -> No subscribers, dropped")
+        return self.publish_to(targets, msg, timeout)
+
+    def publish_to(self, targets, msg, timeout=None):
+        delivered = []
+        for i, q_name in enumerate(targets):
+            try:
+                self.queues[q_name].put(msg, timeout=timeout)
+            except queue.Full:
+                raise PartialDelivery(delivered, list(targets[i:])) from None
+            delivered.append(q_name)
+            if self.verbose:
+                print(f"   -> Enqueued to {q_name}")
+        return delivered
 
 class Consumer:
     def __init__(self, type):
         self.type = type
-        
+
     def process(self, exchange):
         q = exchange.queues[self.type]
         while not q.empty():
             msg = q.get()
             print(f"✅ [{self.type.upper()} Worker] Sending: {msg}")
 
+# ==========================================
+# 🏭 DISPATCHER (Worker Pools + Batches + Backpressure)
+# ==========================================
+# PROBLEM: One Consumer drains one queue, one message at a time, and the
+# channels run one after another. SMS gateway takes 50ms? Then 1,000 SMS = 50s,
+# and email waits behind it.
+#
+# FIX:
+# 1. POOLS: N worker threads PER CHANNEL. Slow SMS can't starve push, and
+#    N sends are in flight at once (the wait is network I/O, so the GIL is free).
+# 2. BATCHES: A worker grabs whatever is queued (up to batch_size) and sends
+#    it in ONE call. Most providers accept batches, so the round trip is paid once.
+# 3. BACKPRESSURE: Bounded queues. If workers fall behind, publish() blocks
+#    instead of piling messages up in RAM until the process dies.
+
+_STOP = object() # Sentinel: one per worker on shutdown
+
+class Dispatcher:
+    def __init__(self, exchange, senders, workers=4, batch_size=10):
+        # senders: {channel: fn(list_of_msgs)}. workers: int or {channel: int}
+        self.exchange = exchange
+        self.senders = senders
+        self.workers = workers if isinstance(workers, dict) else {name: workers for name in senders}
+        self.batch_size = batch_size
+        self.sent = {name: 0 for name in senders}
+        self.batches = {name: 0 for name in senders}
+        self.failed = {name: 0 for name in senders} # Messages in batches whose send() raised
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        for name in self.senders:
+            for i in range(self.workers[name]):
+                t = threading.Thread(target=self._work, args=(name,), name=f"{name}-{i}", daemon=True)
+                t.start()
+                self.threads.append(t)
+
+    def _work(self, name):
+        q, send = self.exchange.queues[name], self.senders[name]
+        while True:
+            batch, stopping = [], False
+            msg = q.get() # Block for the first one...
+            while True:
+                if msg is _STOP:
+                    stopping = True
+                    break
+                batch.append(msg)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    msg = q.get_nowait() # ...then take what's already there. Never wait to fill a batch.
+                except queue.Empty:
+                    break
+            if batch:
+                # A raising provider must not kill the worker: nobody would drain the
+                # queue, and stop() would block forever on a full one
+                try:
+                    send(batch)
+                except Exception as e:
+                    print(f"❌ [{threading.current_thread().name}] Batch of {len(batch)} failed: {e!r}")
+                    with self.lock:
+                        self.failed[name] += len(batch)
+                else:
+                    with self.lock:
+                        self.sent[name] += len(batch)
+                        self.batches[name] += 1
+            if stopping:
+                return
+
+    def stop(self):
+        # Sentinels queue up BEHIND pending messages, so everything is delivered first
+        for name in self.senders:
+            for _ in range(self.workers[name]):
+                self.exchange.queues[name].put(_STOP)
+        for t in self.threads:
+            t.join()
+        self.threads = []
+
+# ==========================================
+# 💾 SPILL-TO-DISK QUEUE (Survive a Long Outage)
+# ==========================================
+# PROBLEM: The SMS gateway is down for 10 minutes and events keep coming.
+# An unbounded queue.Queue keeps every one in RAM until the process OOMs,
+# and then ALL of them are lost. Blocking publish protects RAM but stalls the app.
+#
+# FIX: A hybrid queue. Keep up to `memory_limit` messages in RAM. Past that,
+# APPEND them to segment files on disk (sequential writes = the cheapest I/O).
+#   - FIFO: once anything is on disk, new messages go to disk too, behind it.
+#   - Drain: when RAM runs dry, read the next chunk from the oldest segment
+#     (sequential reads) and delete each segment once it's fully read.
+#   - Durability: fsync every `fsync_every` records, not every message. A power
+#     cut loses at most that many; per-message fsync caps you at the disk's flush rate.
+# Record = 4-byte length + pickle. Length 0 = the Dispatcher's stop sentinel.
+# (Replaying leftover segments after a crash is left out to keep this short.)
+
+_RECORD_LEN = struct.Struct("<I")
+
+class SpillQueue:
+    # Same put/get/get_nowait/qsize/empty as queue.Queue, so Dispatcher works unchanged
+    def __init__(self, directory, memory_limit=10_000, segment_bytes=4 << 20, fsync_every=512, read_batch=1_000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.read_batch = max(1, min(read_batch, memory_limit)) # memory_limit=0 = disk only, still read 1 at a time
+        self.memory = collections.deque()
+        self.on_disk = 0 # Records written but not read back yet
+        self.disk_bytes = 0
+        self.peak_disk_bytes = 0
+        self.segments = collections.deque() # Oldest first. The last one is being written.
+        self.next_segment = 0
+        self.writer = None
+        self.reader = None
+        self.unsynced = 0
+        self.cond = threading.Condition()
+
+    def put(self, item, block=True, timeout=None):
+        # Never blocks: disk absorbs the overflow
+        with self.cond:
+            if self.on_disk == 0 and len(self.memory) < self.memory_limit:
+                self.memory.append(item)
+            else:
+                self._append(item)
+            self.cond.notify()
+
+    def get(self, block=True, timeout=None):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.memory or self.on_disk, timeout if block else 0):
+                raise queue.Empty
+            if not self.memory:
+                self._refill()
+            return self.memory.popleft()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        return len(self.memory) + self.on_disk
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def close(self):
+        with self.cond:
+            self._drop_segments()
+
+    def _append(self, item):
+        payload = b"" if item is _STOP else pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+        if self.writer is None or self.writer.tell() >= self.segment_bytes:
+            self._roll()
+        self.writer.write(_RECORD_LEN.pack(len(payload)) + payload) # Buffered: many records per syscall
+        self.on_disk += 1
+        self.disk_bytes += _RECORD_LEN.size + len(payload)
+        self.peak_disk_bytes = max(self.peak_disk_bytes, self.disk_bytes)
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every:
+            self._sync()
+
+    def _sync(self):
+        self.writer.flush()
+        os.fsync(self.writer.fileno())
+        self.unsynced = 0
+
+    def _roll(self):
+        if self.writer is not None:
+            self._sync()
+            self.writer.close()
+        path = os.path.join(self.directory, f"{self.next_segment:08d}.seg")
+        self.next_segment += 1
+        self.writer = open(path, "ab")
+        self.segments.append(path)
+
+    def _refill(self):
+        # RAM is empty: pull the next chunk, oldest segment first
+        self.writer.flush() # Make buffered records visible to the reader (durable or not)
+        while len(self.memory) < self.read_batch and self.on_disk:
+            if self.reader is None:
+                self.reader = open(self.segments[0], "rb")
+            header = self.reader.read(_RECORD_LEN.size)
+            if not header: # Segment fully read -> delete it
+                self.reader.close()
+                self.reader = None
+                os.remove(self.segments.popleft())
+                continue
+            size = _RECORD_LEN.unpack(header)[0]
+            self.memory.append(_STOP if size == 0 else pickle.loads(self.reader.read(size)))
+            self.on_disk -= 1
+            self.disk_bytes -= _RECORD_LEN.size + size
+        if self.on_disk == 0:
+            self._drop_segments() # Caught up: the next spill starts a fresh file
+
+    def _drop_segments(self):
+        for f in (self.reader, self.writer):
+            if f is not None:
+                f.close()
+        self.reader = self.writer = None
+        while self.segments:
+            os.remove(self.segments.popleft())
+        self.on_disk = self.disk_bytes = self.unsynced = 0
+
+# ==========================================
+# 📊 BENCHMARK (Simulated Provider Latency)
+# ==========================================
+# One call to the provider = fixed round trip + a little per message in the batch.
+LATENCY = {"email": 0.005, "sms": 0.010, "push": 0.002}
+PER_MESSAGE = 0.0002
+
+def make_senders(latency=LATENCY, per_message=PER_MESSAGE):
+    return {name: (lambda batch, rtt=rtt: time.sleep(rtt + per_message * len(batch)))
+            for name, rtt in latency.items()}
+
+def run_dispatch_benchmark(num_messages=40, workers=4, batch_size=10):
+    # Bump num_messages to 1_000 (and LATENCY to real 20-100ms) for production-like numbers.
+    deliveries = num_messages * len(LATENCY)
+    print(f"\n--- 🏭 Benchmark: {num_messages} events x {len(LATENCY)} channels, "
+          f"provider RTT {', '.join(f'{k} {v * 1e3:.0f}ms' for k, v in LATENCY.items())} ---")
+
+    senders = make_senders()
+    exchange = NotificationExchange(verbose=False)
+    for i in range(num_messages):
+        exchange.publish(f"event {i}")
+    start = time.perf_counter()
+    for name, q in exchange.queues.items(): # The original: one channel after another, one by one
+        while not q.empty():
+            senders[name]([q.get()])
+    elapsed = time.perf_counter() - start
+    print(f"   {'Sequential Consumers':<30} {deliveries / elapsed:>9,.0f} deliveries/s")
+
+    for label, pool, batch in ((f"{workers} workers/channel", workers, 1),
+                               (f"{workers} workers/channel, batch {batch_size}", workers, batch_size)):
+        exchange = NotificationExchange(maxsize=100, verbose=False)
+        dispatcher = Dispatcher(exchange, make_senders(), workers=pool, batch_size=batch)
+        start = time.perf_counter()
+        dispatcher.start()
+        for i in range(num_messages):
+            exchange.publish(f"event {i}")
+        dispatcher.stop()
+        elapsed = time.perf_counter() - start
+        calls = sum(dispatcher.batches.values())
+        print(f"   {label:<30} {deliveries / elapsed:>9,.0f} deliveries/s  ({calls} provider calls)")
+
+def linear_match(compiled, topic):
+    # Baseline: pre-split patterns ('*' only), checked one by one on every publish
+    words = topic.split(".")
+    return {sub for parts, sub in compiled
+            if len(parts) == len(words) and all(p == "*" or p == w for p, w in zip(parts, words))}
+
+def make_subscriptions(n, rng):
+    entities = ["user", "order", "payment", "driver", "ride", "invoice", "cart", "review"]
+    events = ["created", "updated", "deleted", "registered", "shipped", "failed", "refunded", "rated"]
+    subs = []
+    for i in range(n):
+        entity = rng.choice(entities)
+        key = "*" if rng.random() < 0.05 else str(rng.randrange(50_000)) # Mostly "notify me about MY order"
+        event = "*" if rng.random() < 0.3 else rng.choice(events)
+        subs.append((f"{entity}.{key}.{event}", f"sub-{i}"))
+    return subs, entities, events
+
+def run_routing_benchmark(sizes=(1_000, 10_000, 100_000), publishes=2_000, linear_publishes=5):
+    rng = random.Random(24)
+    print("\n--- 🔀 Benchmark: route one publish against N wildcard subscriptions ---")
+    print(f"{'Subscriptions':>14} {'Trie':>12} {'Linear scan':>14} {'Avg matches':>12}")
+    for n in sizes:
+        subs, entities, events = make_subscriptions(n, rng)
+        router = TopicRouter()
+        for pattern, sub in subs:
+            router.subscribe(pattern, sub)
+        topics = [f"{rng.choice(entities)}.{rng.randrange(50_000)}.{rng.choice(events)}" for _ in range(publishes)]
+
+        start = time.perf_counter()
+        matches = sum(len(router.match(t)) for t in topics)
+        trie = (time.perf_counter() - start) / publishes
+
+        compiled = [(p.split("."), sub) for p, sub in subs]
+        start = time.perf_counter()
+        for t in topics[:linear_publishes]:
+            linear_match(compiled, t)
+        linear = (time.perf_counter() - start) / linear_publishes
+        print(f"{n:>14,} {trie * 1e6:>10.1f}us {linear * 1e6:>12,.0f}us {matches / publishes:>12.1f}")
+
+def run_outage_simulation(rate=40, outage_seconds=600, memory_limit=2_000):
+    # SMS gateway down for 10 minutes at `rate` events/s. Bump rate to 1_000 for 600k messages.
+    # (tracemalloc slows both queues down equally; compare them, not absolute rates.)
+    n = rate * outage_seconds
+    print(f"\n--- 💾 Outage: SMS down {outage_seconds // 60} min at {rate}/s = {n:,} queued messages ---")
+    print(f"{'Queue':<26} {'Peak RAM':>10} {'Peak disk':>10} {'Enqueue':>12} {'Dequeue':>12}")
+    for label, make in (("queue.Queue (unbounded)", lambda d: queue.Queue()),
+                        (f"SpillQueue (RAM {memory_limit:,})", lambda d: SpillQueue(d, memory_limit))):
+        with tempfile.TemporaryDirectory() as directory:
+            q = make(directory)
+            tracemalloc.start()
+            start = time.perf_counter()
+            for i in range(n):
+                q.put({"to": f"+1555{i:07d}", "body": f"Your code is {i % 1_000_000:06d}", "ts": i / rate})
+            enqueue = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            start = time.perf_counter()
+            for i in range(n): # Gateway is back: drain everything, in order
+                assert q.get_nowait()["to"] == f"+1555{i:07d}"
+            dequeue = time.perf_counter() - start
+            disk = getattr(q, "peak_disk_bytes", 0)
+            print(f"{label:<26} {peak / 2**20:>8.1f}MB {disk / 2**20:>8.1f}MB "
+                  f"{n / enqueue:>9,.0f}/s {n / dequeue:>9,.0f}/s")
+
+def run_backpressure_demo(num_messages=30, maxsize=5):
+    # SMS gateway stalls (50ms per call, 1 worker). Watch the queue stay bounded.
+    exchange = NotificationExchange(maxsize=maxsize, verbose=False)
+    senders = make_senders({**LATENCY, "sms": 0.05})
+    dispatcher = Dispatcher(exchange, senders, workers={"email": 2, "sms": 1, "push": 2}, batch_size=1)
+    dispatcher.start()
+    deepest, blocked = 0, 0.0
+    for i in range(num_messages):
+        start = time.perf_counter()
+        exchange.publish(f"event {i}")
+        blocked += time.perf_counter() - start
+        deepest = max(deepest, exchange.queues["sms"].qsize())
+    dispatcher.stop()
+    print(f"\n🚧 SMS stalled: deepest SMS queue {deepest}/{maxsize}, "
+          f"publisher blocked {blocked * 1e3:.0f}ms total, delivered {dispatcher.sent['sms']}/{num_messages}")
+
 if __name__ == "__main__":
     exchange = NotificationExchange()
     exchange.publish("User 123 Registered")
-    
+
     # Workers process in parallel (simulated here)
     print("\n--- Processing ---")
     Consumer("email").process(exchange)
     Consumer("sms").process(exchange)
     Consumer("push").process(exchange)
+
+    print("\n--- 🏭 Dispatcher: 2 workers per channel, batches of up to 3 ---")
+    exchange = NotificationExchange(maxsize=10, verbose=False)
+    print_lock = threading.Lock()
+
+    def printer(name):
+        def send(batch):
+            with print_lock:
+                print(f"✅ [{name.upper()} {threading.current_thread().name}] Sending batch of {len(batch)}: {batch}")
+        return send
+
+    dispatcher = Dispatcher(exchange, {name: printer(name) for name in exchange.queues}, workers=2, batch_size=3)
+    for i in range(5):
+        exchange.publish(f"Order {i} shipped") # Queued before start(), so workers find full batches
+    dispatcher.start()
+    dispatcher.stop()
+
+    print("\n--- 🔀 Topic Subscriptions ---")
+    exchange = NotificationExchange(channels=(), verbose=True)
+    exchange.subscribe("user.*.registered", "email")
+    exchange.subscribe("order.*.shipped", "sms")
+    exchange.subscribe("order.*.shipped", "push")
+    exchange.subscribe("#", "audit") # Sees everything
+    exchange.publish("Welcome!", topic="user.123.registered")
+    exchange.publish("On its way", topic="order.77.shipped")
+    exchange.publish("Avatar updated", topic="user.123.avatar_changed")
+    run_routing_benchmark()
+    print("\n🏆 Insight: Compile subscriptions into a trie. Publish cost follows the topic and its matches,")
+    print("   not the total subscriber count.")
+    print("   🏢 Real World: **RabbitMQ** topic exchanges (`*` and `#`) route with a trie of words.")
+
+    run_dispatch_benchmark()
+    run_backpressure_demo()
+    print("\n🏆 Insight: Sends are I/O-bound: run many per channel, batch the round trips,")
+    print("   and bound the queues so a stalled provider slows the publisher instead of killing it.")
+    print("   🏢 Real World: **FCM** and **Amazon SES** accept batched sends. **RabbitMQ** / **Kafka** consumers use prefetch and batches.")
+
+    print("\n--- 💾 Spill Queue: RAM holds 3, the rest goes to disk ---")
+    with tempfile.TemporaryDirectory() as directory:
+        spill = SpillQueue(directory, memory_limit=3, read_batch=2)
+        for i in range(8):
+            spill.put(f"SMS {i}")
+        print(f"   In RAM: {list(spill.memory)}, on disk: {spill.on_disk} in {len(spill.segments)} segment(s)")
+        print(f"   Drained FIFO: {[spill.get() for _ in range(8)]}")
+        print(f"   Segments left after catching up: {len(os.listdir(directory))}")
+        spill.close()
+    run_outage_simulation()
+    print("\n🏆 Insight: Cap RAM and spill the overflow to append-only segments.")
+    print("   A long outage costs disk space, not the process.")
+    print("   🏢 Real World: **RabbitMQ** lazy/quorum queues page messages to disk. **Kafka** is append-only segment files.")
@@ -1,6 +1,13 @@
 # 02_distributed_scheduler.py
-import time
+import bisect
+import hashlib
+import heapq
 import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 # ==========================================
 # ⏱️ DISTRIBUTED SCHEDULER
@@ -9,49 +16,659 @@ import random
 # If all 3 run it, you charge the user 3 times. BAD.
 # Soluton: Leader Election. Only LEADER schedules tasks.
 
+class ManualClock:
+    # Simulated time, so a "5 second outage" takes 0 seconds to run
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+# ==========================================
+# 🔒 LEASE STORE (Atomic Compare-And-Set)
+# ==========================================
+# PROBLEM: "GET leader, then SET leader" on a dict is two steps. Two nodes
+# can both GET "expired" before either SETs -> TWO leaders -> double charge.
+#
+# FIX: The store does check + write in ONE atomic step (compare-and-set).
+# Here: a single SQLite `UPDATE ... WHERE` (SQLite serializes writers, even
+# across processes sharing the file). Same idea as Redis `SET NX PX`,
+# an etcd transaction, or a DynamoDB conditional put.
+#
+# Every successful acquire bumps a FENCING TOKEN (1, 2, 3...), never reused.
+# Whatever the leader writes to carries the token, and the resource refuses
+# tokens older than the newest it has seen.
+
+class SQLiteLeaseStore:
+    def __init__(self, path=":memory:", clock=time.time):
+        self.clock = clock # The STORE's clock decides expiry, not each node's
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock() # Guards the Python connection object, not the data
+        self.calls = 0
+        with self.lock:
+            self.db.execute("CREATE TABLE IF NOT EXISTS leases "
+                            "(name TEXT PRIMARY KEY, holder TEXT, token INTEGER, expires_at REAL)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS fences (resource TEXT PRIMARY KEY, token INTEGER)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS members (node TEXT PRIMARY KEY, last_seen REAL)")
+
+    def acquire(self, name, holder, ttl):
+        # CAS on "lease is expired": exactly one concurrent caller wins. Returns its token or None.
+        now = self.clock()
+        with self.lock:
+            self.calls += 1
+            self.db.execute("INSERT OR IGNORE INTO leases VALUES (?, NULL, 0, 0)", (name,))
+            won = self.db.execute(
+                "UPDATE leases SET holder = ?, token = token + 1, expires_at = ? "
+                "WHERE name = ? AND expires_at <= ?", (holder, now + ttl, name, now)).rowcount
+            if not won:
+                return None
+            # Safe to read back: nobody else can win until our lease expires
+            return self.db.execute("SELECT token FROM leases WHERE name = ?", (name,)).fetchone()[0]
+
+    def renew(self, name, holder, token, ttl):
+        # CAS on (holder, token, still valid). A leader that already lost the lease can't extend it.
+        now = self.clock()
+        with self.lock:
+            self.calls += 1
+            return self.db.execute(
+                "UPDATE leases SET expires_at = ? WHERE name = ? AND holder = ? AND token = ? AND expires_at > ?",
+                (now + ttl, name, holder, token, now)).rowcount == 1
+
+    def release(self, name, holder, token):
+        with self.lock:
+            self.calls += 1
+            self.db.execute("UPDATE leases SET expires_at = 0 WHERE name = ? AND holder = ? AND token = ?",
+                            (name, holder, token))
+
+    def holder(self, name):
+        with self.lock:
+            row = self.db.execute("SELECT holder FROM leases WHERE name = ? AND expires_at > ?",
+                                  (name, self.clock())).fetchone()
+        return row[0] if row else None
+
+    def fence(self, resource, token):
+        # Accept a write only if token >= newest token this resource has seen
+        with self.lock:
+            self.calls += 1
+            return self.db.execute(
+                "INSERT INTO fences VALUES (?, ?) ON CONFLICT(resource) DO UPDATE "
+                "SET token = excluded.token WHERE excluded.token >= fences.token", (resource, token)).rowcount == 1
+
+    def heartbeat(self, node):
+        with self.lock:
+            self.calls += 1
+            self.db.execute("INSERT INTO members VALUES (?, ?) ON CONFLICT(node) DO UPDATE "
+                            "SET last_seen = excluded.last_seen", (node, self.clock()))
+
+    def live_members(self, timeout):
+        with self.lock:
+            self.calls += 1
+            rows = self.db.execute("SELECT node FROM members WHERE last_seen > ? ORDER BY node",
+                                   (self.clock() - timeout,)).fetchall()
+        return [row[0] for row in rows]
+
+# ==========================================
+# 📜 LEASE MANAGER (Background Renewal)
+# ==========================================
+# A lease is leadership WITH an expiry. The leader must keep renewing
+# (every ttl/3) or someone else takes over once it lapses. No renewals from a
+# crashed node -> automatic failover after at most `ttl` seconds.
+#
+# The node also tracks its OWN deadline (measured from BEFORE it asked), so
+# it stops acting as leader on its own even if it can't reach the store.
+
+class LeaseManager:
+    def __init__(self, store, name, holder, ttl=2.0, clock=time.monotonic):
+        self.store = store
+        self.name = name
+        self.holder = holder
+        self.ttl = ttl
+        self.clock = clock
+        self.token = None
+        self.valid_until = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def try_acquire(self):
+        started = self.clock()
+        if self.token is not None and self.store.renew(self.name, self.holder, self.token, self.ttl):
+            self.valid_until = started + self.ttl
+            return True
+        self.token = self.store.acquire(self.name, self.holder, self.ttl)
+        self.valid_until = started + self.ttl if self.token is not None else 0.0
+        return self.token is not None
+
+    def is_leader(self):
+        return self.token is not None and self.clock() < self.valid_until
+
+    def start(self, renew_every=None):
+        # Event.wait instead of sleep: stop() wakes the thread immediately
+        interval = renew_every or self.ttl / 3
+        self._stop.clear()
+        self.try_acquire()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.try_acquire()
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.token is not None:
+            self.store.release(self.name, self.holder, self.token) # Hand over now, not after ttl
+        self.token = None
+
 class ServerNode:
-    def __init__(self, id):
+    def __init__(self, id, store, ttl=2.0, clock=time.monotonic, scheduler=None):
         self.id = id
-        self.is_leader = False
-        self.last_heartbeat = 0
-        
-    def try_become_leader(self, shared_storage):
-        # Atomic "SET IF NOT EXISTS"
-        current_leader = shared_storage.get("leader")
-        now = time.time()
-        
-        if current_leader is None or (now - shared_storage.get("hb", 0) > 2):
-            # Leader dead or empty. I take over.
-            shared_storage["leader"] = self.id
-            shared_storage["hb"] = now
-            self.is_leader = True
-            print(f"👑 [{self.id}] I am the Leader now!")
-        elif current_leader == self.id:
-            # I am still leader, renew lease
-            shared_storage["hb"] = now
-            self.is_leader = True
+        self.store = store
+        self.lease = LeaseManager(store, "scheduler-leader", id, ttl, clock)
+        self.scheduler = scheduler
+
+    @property
+    def is_leader(self):
+        return self.lease.is_leader()
+
+    def try_become_leader(self):
+        previous = self.lease.token
+        if self.lease.try_acquire():
+            if self.lease.token != previous:
+                print(f"👑 [{self.id}] I am the Leader now! (fencing token {self.lease.token})")
         else:
-            self.is_leader = False
-            print(f"💤 [{self.id}] Following leader {current_leader}...")
+            print(f"💤 [{self.id}] Following leader {self.store.holder(self.lease.name)}...")
 
     def run_cron(self):
-        if self.is_leader:
-            print(f"   🚀 [{self.id}] Executing CRON JOB...")
+        if not self.is_leader:
+            return
+        if self.scheduler is None:
+            self.execute("Daily Report", self.lease.token)
+        else:
+            # Only the leader drains the wheel, and every job is fenced on the token we hold NOW
+            token = self.lease.token
+            return self.scheduler.run_pending(
+                lambda handle: self.execute(handle.name or "one-shot job", token, handle.fn))
+
+    def execute(self, job, token, fn=None):
+        # The job's side effect is guarded by the fencing token, not by our belief that we lead
+        if self.store.fence(job, token):
+            print(f"   🚀 [{self.id}] Executing CRON JOB '{job}' (token {token})")
+            if fn is not None:
+                fn()
+        else:
+            print(f"   🛑 [{self.id}] '{job}' rejected: token {token} is stale")
+
+# ==========================================
+# 🍕 PARTITIONED OWNERSHIP (Every Node Does Work)
+# ==========================================
+# PROBLEM: Leader-only means 1 node runs ALL the jobs while the rest idle.
+#
+# FIX: Cut jobs into fixed partitions (hash(job_id) % 1024) and spread the
+# partitions over the LIVE nodes with a consistent-hash ring.
+#   - Membership: every node writes a heartbeat. Live = seen within `timeout`.
+#   - Ring: each node gets `vnodes` points. A partition belongs to the first
+#     node point clockwise from hash(partition).
+#   - Join/leave: only partitions next to THAT node's points change owner (~1/N).
+#     `partition % num_nodes` would reshuffle almost everything.
+# Nodes can briefly disagree while a change propagates. Pair this with
+# per-partition fencing (above) when a job must never run twice.
+
+NUM_PARTITIONS = 1024
+
+def stable_hash(text):
+    # Python's hash() is randomized per process, and every node must agree
+    return int.from_bytes(hashlib.md5(text.encode()).digest()[:8], "big")
+
+def partition_of(job_id, partitions=NUM_PARTITIONS):
+    return stable_hash(job_id) % partitions
+
+class HashRing:
+    def __init__(self, vnodes=64):
+        self.vnodes = vnodes
+        self.points = [] # Sorted ring positions
+        self.owners = [] # Node at the same index
+
+    def add(self, node):
+        for i in range(self.vnodes):
+            point = stable_hash(f"{node}#{i}")
+            at = bisect.bisect(self.points, point)
+            self.points.insert(at, point)
+            self.owners.insert(at, node)
+
+    def remove(self, node):
+        kept = [(p, n) for p, n in zip(self.points, self.owners) if n != node]
+        self.points = [p for p, _ in kept]
+        self.owners = [n for _, n in kept]
+
+    def owner(self, key):
+        if not self.points:
+            return None
+        return self.owners[bisect.bisect(self.points, stable_hash(key)) % len(self.points)]
+
+class PartitionedNode:
+    def __init__(self, id, store, vnodes=64, timeout=6.0, partitions=NUM_PARTITIONS):
+        self.id = id
+        self.store = store
+        self.timeout = timeout
+        self.partitions = partitions
+        self.ring = HashRing(vnodes)
+        self.members = set()
+
+    def heartbeat(self):
+        self.store.heartbeat(self.id)
+
+    def refresh(self):
+        # Apply membership changes to the ring incrementally. Returns (joined, left).
+        live = set(self.store.live_members(self.timeout))
+        joined, left = live - self.members, self.members - live
+        for node in sorted(joined):
+            self.ring.add(node)
+        for node in sorted(left):
+            self.ring.remove(node)
+        self.members = live
+        return joined, left
+
+    def owner_of(self, job_id):
+        return self.ring.owner(f"partition-{partition_of(job_id, self.partitions)}")
+
+    def owns(self, job_id):
+        return self.owner_of(job_id) == self.id
+
+# ==========================================
+# 🎡 HIERARCHICAL TIMING WHEEL (Millions of Timers)
+# ==========================================
+# PROBLEM: One hard-coded job is easy. 1,000,000 cron jobs and delayed
+# emails are not: a heap costs O(log N) per schedule AND per fire, and a
+# cancelled job sits in the heap until it reaches the top.
+#
+# FIX: A clock face. Wheel 0 has 64 slots, one per tick. A timer due in 5
+# ticks goes in slot (now + 5) % 64. Each tick: empty ONE slot, done.
+# Timers further out go on coarser wheels (64 ticks/slot, 4096 ticks/slot...),
+# like the hour hand. When the fine wheel wraps, one coarse slot is poured
+# back down ("cascade"). With 4 wheels of 64 slots, 1-second ticks cover 194 days.
+#   schedule: O(1) (pick wheel from the delay's bit length)
+#   cancel:   O(1) (discard from the slot's set)
+#   fire:     O(1) per timer, plus at most `levels` cascades over its lifetime
+
+class TimerHandle:
+    __slots__ = ("expires", "fn", "name", "cron", "slot")
+
+    def __init__(self, expires, fn, name=None, cron=None):
+        self.expires = expires # Tick number
+        self.fn = fn
+        self.name = name
+        self.cron = cron # Parsed cron fields for recurring jobs
+        self.slot = None # The set currently holding this timer
+
+class TimingWheel:
+    def __init__(self, start_tick=0, slots=64, levels=4):
+        assert slots & (slots - 1) == 0, "slots must be a power of two"
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.levels = levels
+        self.span = 1 << (self.bits * levels)
+        self.wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.current = start_tick # Next tick to process
+
+    def add(self, handle):
+        # Beyond the top wheel's reach: park at its edge, the cascade re-files it later
+        delta = min(max(handle.expires - self.current, 0), self.span - 1)
+        level = (delta.bit_length() - 1) // self.bits if delta else 0
+        slot = self.wheels[level][((self.current + delta) >> (self.bits * level)) & self.mask]
+        slot.add(handle)
+        handle.slot = slot
+
+    def remove(self, handle):
+        if handle.slot is None:
+            return False
+        handle.slot.discard(handle)
+        handle.slot = None
+        return True
+
+    def advance(self, tick):
+        # Process every tick up to and including `tick`; return the timers that expired
+        due = []
+        while self.current <= tick:
+            t = self.current
+            level = 1
+            while level < self.levels and (t >> (self.bits * (level - 1))) & self.mask == 0:
+                slot = self.wheels[level][(t >> (self.bits * level)) & self.mask]
+                pending = list(slot)
+                slot.clear()
+                for handle in pending:
+                    self.add(handle) # Lands on a finer wheel now
+                level += 1
+            slot = self.wheels[0][t & self.mask]
+            if slot:
+                for handle in slot:
+                    handle.slot = None
+                due.extend(slot)
+                slot.clear()
+            self.current += 1
+        return due
+
+# ⏰ CRON EXPRESSIONS: "minute hour day-of-month month day-of-week"
+# Supports *, 5, 1-5, 1,15,30, */15, 9-17/2. Times are UTC (no DST surprises).
+CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6)) # Day-of-week 0 = Sunday
+
+def parse_cron(expr):
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f"cron needs 5 fields, got {len(fields)}: {expr!r}")
+    parsed = []
+    for text, (lo, hi) in zip(fields, CRON_RANGES):
+        values = set()
+        for part in text.split(","):
+            span, _, step = part.partition("/")
+            if span == "*":
+                start, end = lo, hi
+            elif "-" in span:
+                start, end = map(int, span.split("-"))
+            else:
+                start = int(span)
+                end = hi if step else start # "5/10" = every 10 starting at 5
+            if not lo <= start <= end <= hi:
+                raise ValueError(f"{part!r} out of range {lo}-{hi} in {expr!r}")
+            values.update(range(start, end + 1, int(step or 1)))
+        parsed.append(sorted(values))
+    return parsed
+
+def next_cron_time(fields, after):
+    # First matching minute strictly after `after` (epoch seconds)
+    minutes, hours, days, months, weekdays = fields
+    # Like real cron: if BOTH day fields are restricted, either one matching is enough
+    either_day = len(days) < 31 and len(weekdays) < 7
+    t = datetime.fromtimestamp(after, timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for _ in range(366 * 8): # Day by day. "0 0 29 2 *" may wait years for Feb 29.
+        dom_ok, dow_ok = t.day in days, (t.weekday() + 1) % 7 in weekdays
+        if t.month in months and ((dom_ok or dow_ok) if either_day else (dom_ok and dow_ok)):
+            for h in hours:
+                for m in minutes:
+                    if (h, m) >= (t.hour, t.minute):
+                        return t.replace(hour=h, minute=m).timestamp()
+        t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+    raise ValueError("cron expression never fires")
+
+class TimingWheelScheduler:
+    def __init__(self, clock=time.time, tick=1.0, workers=4):
+        self.clock = clock
+        self.tick = tick
+        self.wheel = TimingWheel(int(clock() // tick))
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock() # schedule/cancel may come from other threads
+
+    def schedule_once(self, delay, fn, name=None):
+        handle = TimerHandle(int((self.clock() + delay) // self.tick), fn, name)
+        with self.lock:
+            self.wheel.add(handle)
+        return handle
+
+    def schedule_cron(self, expr, fn, name=None):
+        fields = parse_cron(expr)
+        handle = TimerHandle(int(next_cron_time(fields, self.clock()) // self.tick), fn, name or expr, fields)
+        with self.lock:
+            self.wheel.add(handle)
+        return handle
+
+    def cancel(self, handle):
+        # Cron jobs are re-armed inside run_pending() under the same lock,
+        # so a pending handle is always in a slot and remove() is enough
+        with self.lock:
+            return self.wheel.remove(handle)
+
+    def run_pending(self, run=None):
+        # Fire everything due by now on the worker pool (`run(handle)` wraps each job,
+        # e.g. to fence it). Cron jobs re-arm for their next slot AFTER now: a wheel
+        # left undrained for 5 days fires its daily job once, not 5 times.
+        with self.lock:
+            now = int(self.clock() // self.tick)
+            due = self.wheel.advance(now)
+            for handle in due:
+                if handle.cron is not None:
+                    handle.expires = int(next_cron_time(handle.cron, max(handle.expires, now) * self.tick) // self.tick)
+                    self.wheel.add(handle)
+        if run is None:
+            return [self.pool.submit(handle.fn) for handle in due]
+        return [self.pool.submit(run, handle) for handle in due]
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+# ==========================================
+# 📊 FAILOVER SIMULATION (Hundreds of Nodes)
+# ==========================================
+def measure_failover(num_nodes, ttl, rng):
+    # Event-driven on a ManualClock: each node wakes at its own (jittered) times.
+    # Everyone talks to the store every ~ttl/3: the leader to renew, followers to retry.
+    clock = ManualClock()
+    store = SQLiteLeaseStore(clock=clock)
+    nodes = [LeaseManager(store, "scheduler-leader", f"node-{i}", ttl, clock) for i in range(num_nodes)]
+    retry = ttl / 3
+    wakeups = [(rng.uniform(0, retry), i) for i in range(num_nodes)]
+    heapq.heapify(wakeups)
+    crash_at = rng.uniform(3 * ttl, 6 * ttl)
+    crashed = None
+    while wakeups:
+        when, i = heapq.heappop(wakeups)
+        if crashed is None and when >= crash_at:
+            clock.now = crash_at
+            crashed = next(n for n in nodes if n.is_leader()) # Leader dies: no more renewals
+        clock.now = max(clock.now, when)
+        node = nodes[i]
+        if node is crashed:
+            continue
+        if node.try_acquire() and crashed is not None:
+            # New leader runs the job. The dead leader's token must now be fenced out.
+            store.fence("Daily Report", node.token)
+            stale_rejected = not store.fence("Daily Report", crashed.token)
+            return clock.now - crash_at, store.calls / clock.now, stale_rejected
+        heapq.heappush(wakeups, (when + retry * rng.uniform(0.8, 1.2), i))
+
+def run_failover_simulation(num_nodes=300, trials=5):
+    # Bump num_nodes to 2_000 to feel the store load. Failover time barely changes.
+    rng = random.Random(20)
+    print(f"\n--- 💀 Failover: {num_nodes} nodes, leader crashes, {trials} trials per TTL ---")
+    print(f"{'TTL':>6} {'Avg failover':>13} {'Max failover':>13} {'Store calls/s':>14} {'Stale fenced':>13}")
+    for ttl in (1.0, 3.0, 10.0):
+        results = [measure_failover(num_nodes, ttl, rng) for _ in range(trials)]
+        times = [r[0] for r in results]
+        print(f"{ttl:>5.0f}s {sum(times) / trials:>12.2f}s {max(times):>12.2f}s "
+              f"{sum(r[1] for r in results) / trials:>14,.0f} {sum(r[2] for r in results):>8}/{trials}")
+
+def run_partition_simulation(num_nodes=10, num_jobs=100_000, timeout=6.0, heartbeat_every=2.0):
+    # Bump num_jobs to 1_000_000: partition counts stay the same, so the cost barely moves.
+    jobs_in = [0] * NUM_PARTITIONS
+    for j in range(num_jobs):
+        jobs_in[partition_of(f"job-{j}")] += 1
+    print(f"\n--- 🍕 Churn: {num_nodes} nodes, {num_jobs:,} jobs in {NUM_PARTITIONS} partitions; "
+          f"+1 node joins, then 1 crashes ---")
+    print(f"{'Placement':<16} {'Peak/avg load':>14} {'Min/avg load':>13} {'Moved on join':>14} "
+          f"{'Moved on crash':>15} {'Detected in':>12}")
+
+    def report(name, before, joined, crashed, detect):
+        loads = {}
+        for p, owner in enumerate(before):
+            loads[owner] = loads.get(owner, 0) + jobs_in[p]
+        avg = num_jobs / num_nodes
+        moved = lambda a, b: sum(jobs_in[p] for p in range(NUM_PARTITIONS) if a[p] != b[p]) / num_jobs
+        print(f"{name:<16} {max(loads.values()) / avg:>13.2f}x {min(loads.values()) / avg:>12.2f}x "
+              f"{moved(before, joined):>13.1%} {moved(joined, crashed):>14.1%} {detect:>12}")
+
+    names = [f"node-{i}" for i in range(num_nodes + 1)]
+    modulo = lambda n: [names[p % n] for p in range(NUM_PARTITIONS)]
+    report("modulo", modulo(num_nodes), modulo(num_nodes + 1), modulo(num_nodes), "-")
+
+    for vnodes in (1, 16, 128):
+        clock = ManualClock()
+        store = SQLiteLeaseStore(clock=clock)
+        observer = PartitionedNode("observer", store, vnodes, timeout) # Every node builds this same view
+        alive = names[:num_nodes]
+
+        def tick():
+            clock.advance(heartbeat_every)
+            for name in alive:
+                store.heartbeat(name)
+            return observer.refresh()
+
+        def owners():
+            return [observer.ring.owner(f"partition-{p}") for p in range(NUM_PARTITIONS)]
+
+        tick()
+        before = owners()
+        alive.append(names[num_nodes]) # Joins by heartbeating
+        tick()
+        joined = owners()
+        alive.remove(names[3]) # Crashes: heartbeats stop
+        crash_at = clock()
+        while not tick()[1]:
+            pass
+        report(f"ring, {vnodes} vnodes", before, joined, owners(), f"{clock() - crash_at:.0f}s")
+
+class HeapScheduler:
+    # Baseline: the textbook priority queue. Cancel = lazy tombstone (true removal is O(N)).
+    def __init__(self, start_tick=0):
+        self.heap = []
+        self.cancelled = set()
+        self.seq = 0
+
+    def add(self, handle):
+        self.seq += 1
+        heapq.heappush(self.heap, (handle.expires, self.seq, handle))
+
+    def remove(self, handle):
+        self.cancelled.add(handle)
+        return True
+
+    def advance(self, tick):
+        due = []
+        while self.heap and self.heap[0][0] <= tick:
+            handle = heapq.heappop(self.heap)[2]
+            if handle in self.cancelled:
+                self.cancelled.discard(handle)
+            else:
+                due.append(handle)
+        return due
+
+def run_timer_benchmark(n=100_000, cancel_ratio=0.1, horizon=86_400):
+    # Bump n to 1_000_000 for the full "10^6 pending jobs" run.
+    rng = random.Random(21)
+    delays = [rng.randint(1, horizon) for _ in range(n)]
+    doomed = rng.sample(range(n), int(n * cancel_ratio))
+    print(f"\n--- 🎡 Benchmark: {n:,} pending timers over {horizon:,} ticks, cancel {cancel_ratio:.0%} ---")
+    print(f"{'Scheduler':<14} {'Schedule':>10} {'Cancel':>10} {'Fire':>10} {'Fired':>9}")
+    for name, make in (("heapq", HeapScheduler), ("timing wheel", TimingWheel)):
+        handles = [TimerHandle(d, None) for d in delays]
+        scheduler = make(0)
+        start = time.perf_counter()
+        for h in handles:
+            scheduler.add(h)
+        t_add = (time.perf_counter() - start) / n
+        start = time.perf_counter()
+        for i in doomed:
+            scheduler.remove(handles[i])
+        t_cancel = (time.perf_counter() - start) / max(len(doomed), 1)
+        start = time.perf_counter()
+        fired = len(scheduler.advance(horizon))
+        t_fire = (time.perf_counter() - start) / max(fired, 1)
+        print(f"{name:<14} {t_add * 1e6:>8.2f}us {t_cancel * 1e6:>8.2f}us {t_fire * 1e6:>8.2f}us {fired:>9,}")
 
 if __name__ == "__main__":
-    store = {} # Mock Redis
-    nodes = [ServerNode("A"), ServerNode("B"), ServerNode("C")]
-    
+    clock = ManualClock()
+    store = SQLiteLeaseStore(clock=clock) # Mock Redis / etcd
+    nodes = [ServerNode(name, store, ttl=2.0, clock=clock) for name in "ABC"]
+
     print("--- ⏱️ Tick 1 (Election) ---")
-    for n in nodes: n.try_become_leader(store)
+    for n in nodes: n.try_become_leader()
     for n in nodes: n.run_cron()
-    
+
     print("\n--- ⏱️ Tick 2 (Stability) ---")
-    for n in nodes: n.try_become_leader(store)
-    
-    print("\n--- 💀 Leader A Dies ---")
-    store["hb"] = time.time() - 5 # Simulate timeout
-    
+    clock.advance(0.5)
+    for n in nodes: n.try_become_leader()
+
+    print("\n--- 💀 Leader A Freezes (GC pause) mid-job ---")
+    paused_token = nodes[0].lease.token
+    clock.advance(5) # Simulate timeout: A's lease lapses, nobody renews it
+
     print("--- ⏱️ Tick 3 (Re-Election) ---")
-    nodes[1].try_become_leader(store) # Node B checks
+    nodes[1].try_become_leader() # Node B checks
     nodes[1].run_cron()
+
+    print("\n--- 🧟 A wakes up and finishes its job with the OLD token ---")
+    nodes[0].execute("Daily Report", paused_token)
+
+    print("\n--- 🔁 Background renewal (real time, ttl=0.3s) ---")
+    live = SQLiteLeaseStore()
+    leader = LeaseManager(live, "scheduler-leader", "A", ttl=0.3)
+    rival = LeaseManager(live, "scheduler-leader", "B", ttl=0.3)
+    leader.start(renew_every=0.1)
+    threading.Event().wait(0.5) # Longer than ttl: only renewals keep A in charge
+    print(f"   After 0.5s: A leads={leader.is_leader()} (token {leader.token}), B acquires={rival.try_acquire()}")
+    leader.stop()
+    print(f"   A stops and releases: B acquires={rival.try_acquire()} (token {rival.token})")
+
+    run_failover_simulation()
+    print("\n🏆 Insight: Leadership is a LEASE won by compare-and-set. Failover takes about one TTL.")
+    print("   Shorter TTL = faster failover but more store traffic. Fencing tokens stop zombie leaders.")
+    print("   🏢 Real World: **Chubby** sequencers, **ZooKeeper** zxid, **etcd** lease revisions, **Kubernetes** Lease objects.")
+
+    print("\n--- 🎡 Timing Wheel: one simulated hour on the leader ---")
+    clock = ManualClock(datetime(2024, 1, 1, 11, 30, tzinfo=timezone.utc).timestamp())
+    scheduler = TimingWheelScheduler(clock=clock, workers=2)
+    fired, fired_lock = [], threading.Lock()
+
+    def job(name):
+        def run():
+            with fired_lock:
+                fired.append((datetime.fromtimestamp(clock(), timezone.utc).strftime("%H:%M"), name))
+        return run
+
+    scheduler.schedule_cron("*/15 * * * *", job("Metrics rollup"))
+    scheduler.schedule_cron("0 12 * * *", job("Daily Report"))
+    scheduler.schedule_once(90, job("Welcome email"))
+    scheduler.cancel(scheduler.schedule_once(600, job("Abandoned-cart email"))) # User checked out
+    leader = ServerNode("L", SQLiteLeaseStore(clock=clock), ttl=180, clock=clock, scheduler=scheduler)
+    leader.try_become_leader()
+    for _ in range(60):
+        clock.advance(60)
+        leader.try_become_leader()
+        for future in leader.run_cron() or []:
+            future.result() # Demo only: wait so each job logs the minute it was due
+    scheduler.shutdown()
+    for at, name in fired:
+        print(f"   ⏰ {at} {name}")
+
+    run_timer_benchmark()
+    print("\n🏆 Insight: A timing wheel makes schedule/cancel/fire O(1), and cancelled jobs leave immediately.")
+    print("   heapq is C code, so schedule is a tie. Bump n 10x: heap fire cost climbs with log N, the wheel stays flat.")
+    print("   🏢 Real World: **Kafka** purgatory timers, **Netty** HashedWheelTimer, Linux kernel timer wheel.")
+
+
+    print("\n--- 🍕 Partitioned Jobs: everyone works, not just the leader ---")
+    clock = ManualClock()
+    store = SQLiteLeaseStore(clock=clock)
+    workers = [PartitionedNode(name, store, timeout=6.0) for name in "ABC"]
+    jobs = [f"job-{i}" for i in range(12)]
+    for w in workers: w.heartbeat()
+    for w in workers: w.refresh()
+    before = {job: workers[0].owner_of(job) for job in jobs}
+    for w in workers:
+        print(f"   🖥️  [{w.id}] runs {[j for j in jobs if w.owns(j)]}")
+
+    print("💀 C stops heartbeating...")
+    for _ in range(4):
+        clock.advance(2)
+        for w in workers[:2]: w.heartbeat()
+    for w in workers[:2]: w.refresh()
+    moved = [j for j in jobs if workers[0].owner_of(j) != before[j]]
+    print(f"   Moved: {moved} (all were C's: {all(before[j] == 'C' for j in moved)})")
+
+    run_partition_simulation()
+    print("\n🏆 Insight: Partition by consistent hashing and every live node shares the work.")
+    print("   More vnodes = flatter load. A join or crash moves ~1/N of the jobs, not all of them.")
+    print("   🏢 Real World: **Cassandra** vnodes, **Temporal** history shards placed on a hash ring.")
@@ -1,5 +1,11 @@
 # 03_geospatial_index.py
+import heapq
+import itertools
 import random
+import time
+import tracemalloc
+
+import numpy as np
 
 # ==========================================
 # 📍 GEOSPATIAL INDEXING (QuadTree / Geohash)
@@ -15,21 +21,28 @@ class Driver:
         self.y = y
 
 class QuadTree:
-    def __init__(self, boundary, capacity=4):
+    def __init__(self, boundary, capacity=4, parent=None, index=None):
         self.boundary = boundary # (x, y, w, h)
         self.capacity = capacity
         self.drivers = []
         self.divided = False
+        self.parent = parent
+        # Driver id -> node holding it. ONE dict shared by the whole tree.
+        self.index = {} if index is None else index
+
+    def _contains(self, px, py):
+        x, y, w, h = self.boundary
+        return x <= px < x + w and y <= py < y + h
         
     def insert(self, driver):
         # 1. Check boundary
-        x, y, w, h = self.boundary
-        if not (x <= driver.x < x + w and y <= driver.y < y + h):
+        if not self._contains(driver.x, driver.y):
             return False 
             
         # 2. Add if room
         if len(self.drivers) < self.capacity:
             self.drivers.append(driver)
+            self.index[driver.id] = self
             return True
             
         # 3. Split if full
@@ -45,12 +58,67 @@ class QuadTree:
         half_w = w / 2
         half_h = h / 2
         
-        self.nw = QuadTree((x, y, half_w, half_h))
-        self.ne = QuadTree((x + half_w, y, half_w, half_h))
-        self.sw = QuadTree((x, y + half_h, half_w, half_h))
-        self.se = QuadTree((x + half_w, y + half_h, half_w, half_h))
+        self.nw = QuadTree((x, y, half_w, half_h), self.capacity, self, self.index)
+        self.ne = QuadTree((x + half_w, y, half_w, half_h), self.capacity, self, self.index)
+        self.sw = QuadTree((x, y + half_h, half_w, half_h), self.capacity, self, self.index)
+        self.se = QuadTree((x + half_w, y + half_h, half_w, half_h), self.capacity, self, self.index)
         self.divided = True
 
+    # ==========================================
+    # 🚗 MOVING DRIVERS (Update / Remove in Place)
+    # ==========================================
+    # PROBLEM: Drivers report GPS every few seconds. With insert() only, the
+    # tree must be REBUILT every tick: O(N log N) for N drivers.
+    #
+    # FIX: The shared index maps driver id -> node, so we jump straight to it.
+    # - Small move, same cell (the common case): just update x/y. O(1).
+    # - Left the cell: detach, climb to the first ancestor that contains the
+    #   new point, insert from there (usually 1-2 levels, not the root).
+    # - Cells that empty out are merged back into their parent, so the tree
+    #   doesn't fill up with dead quadrants as traffic moves across the city.
+
+    def remove(self, driver):
+        node = self.index.pop(driver.id, None)
+        if node is None:
+            return False
+        node.drivers.remove(driver)
+        node._merge_up()
+        return True
+
+    def update(self, driver, x, y):
+        node = self.index.get(driver.id)
+        if node is not None and node._contains(x, y):
+            driver.x, driver.y = x, y # Still in the same cell
+            return True
+        if node is not None:
+            del self.index[driver.id]
+            node.drivers.remove(driver)
+        driver.x, driver.y = x, y
+        target = node or self
+        while target.parent is not None and not target._contains(x, y):
+            target = target.parent
+        inserted = target.insert(driver)
+        if node is not None:
+            node._merge_up()
+        return inserted
+
+    def _merge_up(self):
+        # Collapse a parent whose 4 leaf children fit back inside it
+        node = self if self.divided else self.parent
+        while node is not None and node.divided:
+            children = (node.nw, node.ne, node.sw, node.se)
+            if any(c.divided for c in children):
+                return
+            if len(node.drivers) + sum(len(c.drivers) for c in children) > node.capacity:
+                return
+            for child in children:
+                for d in child.drivers:
+                    node.drivers.append(d)
+                    node.index[d.id] = node
+            node.nw = node.ne = node.sw = node.se = None
+            node.divided = False
+            node = node.parent
+
     def query(self, search_boundary):
         found = []
         x, y, w, h = self.boundary
@@ -72,6 +140,354 @@ class QuadTree:
             
         return found
 
+    # ==========================================
+    # 🌊 STREAMING QUERY (Explicit Stack Generator)
+    # ==========================================
+    # PROBLEM: query() builds a list at EVERY node and extend()s it upward,
+    # so a driver found 12 levels deep is copied 12 times. Clustered data
+    # (a stadium letting out) makes deep trees -> deep Python recursion.
+    # And "show me any 10 drivers" still collects all 5,000 first.
+    #
+    # FIX: Walk with our own stack and yield matches as we find them.
+    # No intermediate lists, no recursion limit, and the caller can stop early.
+
+    def iter_query(self, search_boundary, limit=None):
+        sx, sy, sw, sh = search_boundary
+        if limit is not None and limit <= 0:
+            return
+        remaining = limit
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            x, y, w, h = node.boundary
+            if (sx > x + w or sx + sw < x or sy > y + h or sy + sh < y):
+                continue
+            for d in node.drivers:
+                if (sx <= d.x < sx + sw and sy <= d.y < sy + sh):
+                    yield d
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining <= 0:
+                            return
+            if node.divided:
+                # Reversed so children pop in the same order query() visits them
+                stack.extend((node.se, node.sw, node.ne, node.nw))
+
+    # ==========================================
+    # 🎯 k-NEAREST NEIGHBOURS (Best-First Search)
+    # ==========================================
+    # PROBLEM: "5 closest drivers" with query() means guessing a box size:
+    # too small -> retry bigger, too big -> scan thousands of drivers.
+    #
+    # FIX: A priority queue of quadrants ordered by the MINIMUM possible
+    # distance from the rider to that quadrant's boundary. Always expand the
+    # closest one. Once we hold k drivers and the next quadrant can't beat the
+    # k-th best, nothing left in the tree can -> stop.
+
+    def _min_dist2(self, x, y):
+        bx, by, w, h = self.boundary
+        dx = max(bx - x, 0, x - (bx + w))
+        dy = max(by - y, 0, y - (by + h))
+        return dx * dx + dy * dy
+
+    def nearest(self, x, y, k=1):
+        if k <= 0:
+            return []
+        tiebreak = itertools.count() # Never compare QuadTrees/Drivers on ties
+        frontier = [(0.0, next(tiebreak), self)] # Min-heap: (min dist², _, node)
+        best = [] # Max-heap of size k via negation: (-dist², _, driver)
+        while frontier:
+            min_d2, _, node = heapq.heappop(frontier)
+            if len(best) == k and min_d2 >= -best[0][0]:
+                break # Pruned: no remaining quadrant can hold a closer driver
+            for d in node.drivers:
+                d2 = (d.x - x) ** 2 + (d.y - y) ** 2
+                if len(best) < k:
+                    heapq.heappush(best, (-d2, next(tiebreak), d))
+                elif d2 < -best[0][0]:
+                    heapq.heapreplace(best, (-d2, next(tiebreak), d))
+            if node.divided:
+                for child in (node.nw, node.ne, node.sw, node.se):
+                    child_d2 = child._min_dist2(x, y)
+                    if len(best) < k or child_d2 < -best[0][0]:
+                        heapq.heappush(frontier, (child_d2, next(tiebreak), child))
+        return [d for _, _, d in sorted(best, reverse=True)] # Closest first
+
+# ==========================================
+# 🚦 BATCHED DISPATCH (Match a Window of Riders at Once)
+# ==========================================
+# PROBLEM: Matching riders one by one is first-come-first-served. Rider A
+# grabs the closest driver even when that driver is Rider B's ONLY nearby
+# option, and B gets sent a car from across town.
+#
+# FIX: Collect requests for a short window (~2s), then:
+#   1. Gather each rider's `candidates` closest drivers within `radius` (QuadTree query).
+#   2. Sort ALL (distance, rider, driver) edges together.
+#   3. Greedy: take the shortest edge whose rider AND driver are both still free.
+# One global sort instead of N racing lookups. Riders left over roll into the next window.
+
+class BatchDispatcher:
+    def __init__(self, qt, radius=50.0, candidates=8):
+        self.qt = qt
+        self.radius = radius
+        self.candidates = candidates
+
+    def match(self, riders):
+        # riders: list of (x, y). Returns [(rider index, driver, pickup distance)]
+        r = self.radius
+        edges = []
+        for i, (x, y) in enumerate(riders):
+            near = []
+            for d in self.qt.iter_query((x - r, y - r, 2 * r, 2 * r)):
+                d2 = (d.x - x) ** 2 + (d.y - y) ** 2
+                if d2 <= r * r:
+                    near.append((d2, d.id, d))
+            edges.extend((d2, i, d) for d2, _, d in heapq.nsmallest(self.candidates, near))
+        edges.sort(key=lambda e: e[0])
+
+        matched_riders, matched_drivers, matches = set(), set(), []
+        for d2, i, d in edges:
+            if i in matched_riders or d.id in matched_drivers:
+                continue
+            matched_riders.add(i)
+            matched_drivers.add(d.id)
+            matches.append((i, d, d2 ** 0.5))
+            self.qt.remove(d) # Driver is busy now
+        return matches
+
+def match_one_at_a_time(qt, riders, radius=50.0):
+    # Baseline: each rider takes the nearest free driver the moment they ask
+    matches = []
+    for i, (x, y) in enumerate(riders):
+        best = qt.nearest(x, y, k=1)
+        if best:
+            dist = ((best[0].x - x) ** 2 + (best[0].y - y) ** 2) ** 0.5
+            if dist <= radius:
+                matches.append((i, best[0], dist))
+                qt.remove(best[0])
+    return matches
+
+# ==========================================
+# 📦 BULK-LOADED INDEX (NumPy + Sort-Tile-Recursive)
+# ==========================================
+# PROBLEM: Loading 10M drivers through recursive insert() = 10M Python calls
+# x tree depth, each allocating Driver objects. Minutes, and GBs of RAM.
+#
+# FIX: Keep coordinates in flat NumPy arrays and pack them ONCE (STR):
+#   1. Sort by x, cut into S vertical slices.
+#   2. Sort each slice by y, cut into leaves of `leaf_size` points.
+# Neighbouring points land in the same leaf, and each leaf is a contiguous
+# slice of the arrays with a bounding box. A range query then:
+#   - tests ALL leaf boxes against the query box in one vectorized compare,
+#   - gathers the hit leaves' points by index arithmetic,
+#   - filters them with one more vectorized mask -> array of ids.
+# No Python loop touches individual points. Read-only: rebuild per snapshot.
+
+class STRIndex:
+    def __init__(self, ids, xs, ys, leaf_size=64):
+        ids, xs, ys = np.asarray(ids), np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        n = len(xs)
+        self.leaf_size = leaf_size
+        num_leaves = max(1, -(-n // leaf_size))
+        slices = int(np.ceil(np.sqrt(num_leaves)))
+        slice_size = slices * leaf_size
+        # 1. Rank by x -> slice number. 2. Sort by (slice, y).
+        slice_of = np.empty(n, dtype=np.int64)
+        slice_of[np.argsort(xs, kind="stable")] = np.arange(n) // slice_size
+        order = np.lexsort((ys, slice_of))
+        self.ids, self.xs, self.ys = ids[order], xs[order], ys[order]
+
+        starts = np.arange(0, n, leaf_size)
+        self.min_x = np.minimum.reduceat(self.xs, starts) if n else np.empty(0)
+        self.max_x = np.maximum.reduceat(self.xs, starts) if n else np.empty(0)
+        self.min_y = np.minimum.reduceat(self.ys, starts) if n else np.empty(0)
+        self.max_y = np.maximum.reduceat(self.ys, starts) if n else np.empty(0)
+
+    def query(self, search_boundary):
+        # Same half-open box semantics as QuadTree.query, but returns an id array
+        sx, sy, sw, sh = search_boundary
+        leaves = np.nonzero((self.min_x < sx + sw) & (self.max_x >= sx) &
+                            (self.min_y < sy + sh) & (self.max_y >= sy))[0]
+        if len(leaves) == 0:
+            return self.ids[:0]
+        idx = (leaves[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+        idx = idx[idx < len(self.xs)] # Last leaf may be short
+        xs, ys = self.xs[idx], self.ys[idx]
+        hit = (xs >= sx) & (xs < sx + sw) & (ys >= sy) & (ys < sy + sh)
+        return self.ids[idx[hit]]
+
+    def __len__(self):
+        return len(self.xs)
+
+# ==========================================
+# 📊 BENCHMARKS
+# ==========================================
+def nearest_by_box_expansion(qt, x, y, k, start=1.0):
+    # The workaround nearest() replaces: guess a box, double it until the k-th
+    # closest hit is provably inside the search circle
+    r = start
+    while True:
+        hits = qt.query((x - r, y - r, 2 * r, 2 * r))
+        if len(hits) >= k:
+            hits.sort(key=lambda d: (d.x - x) ** 2 + (d.y - y) ** 2)
+            kth = hits[k - 1]
+            if (kth.x - x) ** 2 + (kth.y - y) ** 2 <= r * r:
+                return hits[:k]
+        if r > 2 * max(qt.boundary[2], qt.boundary[3]):
+            return hits[:k] # Fewer than k drivers in the whole world
+        r *= 2
+
+def count_nodes(qt):
+    if not qt.divided:
+        return 1
+    return 1 + sum(count_nodes(c) for c in (qt.nw, qt.ne, qt.sw, qt.se))
+
+def run_moving_benchmark(n=20_000, ticks=3, step=2.0):
+    # Bump n to 1_000_000 for a city-scale fleet.
+    rng = random.Random(6)
+    world = (0, 0, 1000, 1000)
+    positions = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(n)]
+
+    def moved(px, py):
+        # Random walk, clamped inside the world
+        return (min(max(px + rng.uniform(-step, step), 0), 999.999),
+                min(max(py + rng.uniform(-step, step), 0), 999.999))
+
+    print(f"\n--- 🚗 Benchmark: {n:,} drivers, every driver moves once per tick ---")
+    start = time.perf_counter()
+    for _ in range(ticks):
+        positions = [moved(px, py) for px, py in positions]
+        qt = QuadTree(world)
+        for i, (px, py) in enumerate(positions):
+            qt.insert(Driver(i, px, py))
+    rebuild = (time.perf_counter() - start) / ticks
+
+    qt = QuadTree(world)
+    drivers = [Driver(i, px, py) for i, (px, py) in enumerate(positions)]
+    for d in drivers:
+        qt.insert(d)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for d in drivers:
+            qt.update(d, *moved(d.x, d.y))
+    in_place = (time.perf_counter() - start) / ticks
+    print(f"   Rebuild every tick:   {rebuild * 1e3:>7.0f}ms/tick")
+    print(f"   update() in place:    {in_place * 1e3:>7.0f}ms/tick  ({count_nodes(qt):,} nodes after merges)")
+
+def tree_depth(qt):
+    depth, stack = 0, [(qt, 1)]
+    while stack:
+        node, level = stack.pop()
+        depth = max(depth, level)
+        if node.divided:
+            stack.extend((c, level + 1) for c in (node.nw, node.ne, node.sw, node.se))
+    return depth
+
+def peak_alloc_kb(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+def run_iter_query_benchmark(n=10_000, repeats=5):
+    # Dense region: a stadium letting out, everyone within ~1 unit of the gate.
+    # Bump n to 1_000_000 to see recursion depth and copy costs really bite.
+    rng = random.Random(11)
+    qt = QuadTree((0, 0, 1000, 1000))
+    for i in range(n):
+        qt.insert(Driver(i, min(max(rng.gauss(500, 1), 0), 999.9), min(max(rng.gauss(500, 1), 0), 999.9)))
+    box = (490, 490, 20, 20)
+    print(f"\n--- 🌊 Benchmark: dense box with {len(qt.query(box)):,} hits, tree depth {tree_depth(qt)} ---")
+    cases = {
+        "query() all": lambda: qt.query(box),
+        "list(iter_query()) all": lambda: list(qt.iter_query(box)),
+        "query()[:10]": lambda: qt.query(box)[:10],
+        "iter_query(limit=10)": lambda: list(qt.iter_query(box, limit=10)),
+    }
+    for name, fn in cases.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        elapsed = (time.perf_counter() - start) / repeats
+        print(f"   {name:<24} {elapsed * 1e3:>8.2f}ms  peak alloc {peak_alloc_kb(fn):>8.1f} KB")
+
+def run_dispatch_benchmark(num_drivers=5_000, windows=5, window_size=200, radius=60.0):
+    # Bump num_drivers/window_size 10x for a rush-hour city.
+    rng = random.Random(19)
+    driver_xy = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(num_drivers)]
+    # Demand is lumpy: most requests come from downtown
+    trace = [[(min(max(rng.gauss(500, 120), 0), 999.9), min(max(rng.gauss(500, 120), 0), 999.9))
+              for _ in range(window_size)] for _ in range(windows)]
+    print(f"\n--- 🚦 Benchmark: {windows} windows x {window_size} riders vs {num_drivers:,} drivers ---")
+    for name in ("one at a time", "batched greedy"):
+        qt = QuadTree((0, 0, 1000, 1000))
+        for i, (x, y) in enumerate(driver_xy):
+            qt.insert(Driver(i, x, y))
+        dispatcher = BatchDispatcher(qt, radius)
+        matches = []
+        start = time.perf_counter()
+        for riders in trace:
+            if name == "batched greedy":
+                matches.extend(dispatcher.match(riders))
+            else:
+                matches.extend(match_one_at_a_time(qt, riders, radius))
+        elapsed = time.perf_counter() - start
+        avg = sum(dist for _, _, dist in matches) / max(len(matches), 1)
+        print(f"   {name:<16} {len(matches):>5} matched  {len(matches) / elapsed:>9,.0f} matches/s  "
+              f"avg pickup {avg:>5.1f}")
+
+def run_bulk_benchmark(sizes=(10_000, 50_000), queries=200):
+    # Full run: sizes=(10**5, 10**6, 10**7). QuadTree at 10**7 takes minutes to build.
+    rng = np.random.default_rng(8)
+    print("\n--- 📦 Benchmark: bulk load + 1%-area range queries ---")
+    print(f"{'Points':>10} {'Index':<10} {'Build':>9} {'Queries/s':>11}")
+    for n in sizes:
+        xs, ys = rng.uniform(0, 1000, n), rng.uniform(0, 1000, n)
+        boxes = [(bx, by, 100, 100) for bx, by in rng.uniform(0, 900, (queries, 2)).tolist()]
+
+        start = time.perf_counter()
+        qt = QuadTree((0, 0, 1000, 1000))
+        for i, (px, py) in enumerate(zip(xs.tolist(), ys.tolist())):
+            qt.insert(Driver(i, px, py))
+        qt_build = time.perf_counter() - start
+        start = time.perf_counter()
+        for box in boxes:
+            qt.query(box)
+        qt_qps = queries / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        index = STRIndex(np.arange(n), xs, ys)
+        str_build = time.perf_counter() - start
+        start = time.perf_counter()
+        for box in boxes:
+            index.query(box)
+        str_qps = queries / (time.perf_counter() - start)
+
+        print(f"{n:>10,} {'QuadTree':<10} {qt_build:>8.3f}s {qt_qps:>11,.0f}")
+        print(f"{'':>10} {'STRIndex':<10} {str_build:>8.3f}s {str_qps:>11,.0f}")
+
+def run_knn_benchmark(n=20_000, queries=200, k=5):
+    # Bump n to 1_000_000 for the production-scale numbers (build takes a while).
+    rng = random.Random(5)
+    qt = QuadTree((0, 0, 1000, 1000))
+    for i in range(n):
+        qt.insert(Driver(i, rng.uniform(0, 1000), rng.uniform(0, 1000)))
+    riders = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(queries)]
+    print(f"\n--- 🎯 Benchmark: {k}-nearest over {n:,} drivers, {queries} riders ---")
+    searches = {
+        "boxes, guess 0.1 (small)": lambda x, y: nearest_by_box_expansion(qt, x, y, k, start=0.1),
+        "boxes, guess 10 (lucky)": lambda x, y: nearest_by_box_expansion(qt, x, y, k, start=10),
+        "boxes, guess 100 (big)": lambda x, y: nearest_by_box_expansion(qt, x, y, k, start=100),
+        "nearest()": lambda x, y: qt.nearest(x, y, k),
+    }
+    for name, search in searches.items():
+        start = time.perf_counter()
+        for x, y in riders:
+            search(x, y)
+        elapsed = time.perf_counter() - start
+        print(f"   {name:<25} {elapsed / queries * 1e6:>8.0f}us/query")
+
 if __name__ == "__main__":
     print("--- 📍 QuadTree Simulation (Uber) ---")
     # World is 100x100
@@ -94,3 +510,41 @@ if __name__ == "__main__":
     print("\n🏆 Insight: We filtered 100 drivers without iterating all 100.")
     print("   🏢 Real World: **Uber** uses Google S2 (Space-Filling Curves). **Yelp** uses Geohash.")
     print("   **Postgres PostGIS** uses R-Trees (similar concept).")
+
+    print("\n🎯 3 closest drivers to (50,50):")
+    for d in qt.nearest(50, 50, k=3):
+        print(f"   🚕 Driver {d.id} at ({d.x:.1f}, {d.y:.1f}), {((d.x - 50) ** 2 + (d.y - 50) ** 2) ** 0.5:.1f} away")
+    run_knn_benchmark()
+    print("\n🏆 Insight: Don't guess a radius. Visit quadrants closest-first and stop when none can win.")
+    print("   A lucky guess is as fast, but one radius can't suit downtown AND the suburbs.")
+    print("   🏢 Real World: **PostGIS** `ORDER BY geom <-> point` (KNN-GiST), **Elasticsearch** geo_distance sort.")
+
+    print("\n🚗 Driver 0 moves 1 unit, then goes offline:")
+    d0 = next(d for d in qt.query((0, 0, 100, 100)) if d.id == 0)
+    qt.update(d0, min(d0.x + 1, 99.9), d0.y)
+    print(f"   Now at ({d0.x:.1f}, {d0.y:.1f}). Removed: {qt.remove(d0)}. Still indexed: {0 in qt.index}")
+    run_moving_benchmark()
+    print("\n🏆 Insight: Most GPS pings don't change cells. Index driver -> cell and make them O(1).")
+    print("   🏢 Real World: **Uber** H3 cells; **Redis** GEOADD re-scores an existing member in place.")
+
+    print("\n🌊 First 3 drivers in (40,40)-(60,60), streamed:")
+    for d in qt.iter_query(search_box, limit=3):
+        print(f"   🚕 Driver {d.id} at ({d.x:.1f}, {d.y:.1f})")
+    run_iter_query_benchmark()
+    print("\n🏆 Insight: Yield, don't build. Results are never copied up the tree, and 'any 10' stops after 10.")
+    print("   🏢 Real World: Database cursors (**Postgres** portals, **JDBC** fetchSize) stream rows the same way.")
+
+    print("\n🚦 Two riders, two drivers on a line (A at 0, B at 1.8; drivers at 1 and -1.5):")
+    line = QuadTree((-10, -10, 20, 20))
+    for i, x in enumerate((1.0, -1.5)):
+        line.insert(Driver(i, x, 0.0))
+    for r, d, dist in sorted(BatchDispatcher(line, radius=5).match([(0.0, 0.0), (1.8, 0.0)]), key=lambda m: m[0]):
+        print(f"   Rider {'AB'[r]} -> driver at {d.x:+.1f} ({dist:.1f} away)")
+    print("   (One at a time, A would grab +1.0 and B would drive in from -1.5: total 4.3 vs 2.3.)")
+    run_dispatch_benchmark()
+    print("\n🏆 Insight: Batch a couple of seconds of requests and match globally. Shorter pickups beat instant greed.")
+    print("   🏢 Real World: **Uber** dispatch matches riders in batches, not first-come-first-served.")
+
+    run_bulk_benchmark()
+    print("\n🏆 Insight: For bulk loads, sort once and let NumPy scan packed leaves. Objects are the overhead.")
+    print("   🏢 Real World: **Shapely** STRtree (behind **GeoPandas** `.sindex`) bulk-loads exactly this way.")
@@ -1,4 +1,13 @@
 # 04_lru_cache.py
+import asyncio
+import gc
+import heapq
+import random
+import threading
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import Future
 
 # ==========================================
 # 🧠 LRU CACHE (Least Recently Used)
@@ -12,21 +21,44 @@
 # SOLUTION: HashMap (for lookup) + Doubly Linked List (for ordering).
 
 class Node:
-    def __init__(self, key, val):
+    def __init__(self, key, val, weight=1, expires_at=None):
         self.key = key
         self.val = val
+        self.weight = weight
+        self.expires_at = expires_at # None = never expires
         self.prev = None
         self.next = None
 
+# EXTENSIONS (both optional, both still O(1) per op):
+# 1. WEIGHT: Counting entries lets 3 huge values blow the memory budget.
+#    Pass weigher=len (or sys.getsizeof) + max_weight to budget by bytes.
+# 2. TTL: Expired entries are dropped lazily on get(), AND a bucketed
+#    sweeper drops them in bulk -- otherwise a dead entry sits in memory
+#    until it drifts to the LRU tail. Expiry times are grouped into
+#    `bucket_width`-second buckets; sweep() pops whole buckets off a heap
+#    instead of scanning every key.
+
 class LRUCache:
-    def __init__(self, capacity):
+    def __init__(self, capacity, verbose=True, weigher=None, max_weight=None,
+                 ttl=None, bucket_width=1.0, clock=time.monotonic):
         self.capacity = capacity
+        self.verbose = verbose # Benchmarks turn off the eviction log
         self.cache = {} # Map Key -> Node
         # Dummy head/tail for easy removal/addition
         self.head = Node(0, 0)
         self.tail = Node(0, 0)
         self.head.next = self.tail
         self.tail.prev = self.head
+        # Weight budget
+        self.weigher = weigher # value -> cost. None = every entry weighs 1
+        self.max_weight = max_weight
+        self.total_weight = 0
+        # TTL
+        self.ttl = ttl # Default TTL (seconds) for put(). None = no expiry
+        self.bucket_width = bucket_width
+        self.clock = clock
+        self.expiry_buckets = {} # Bucket id -> set of keys expiring in it
+        self.bucket_heap = [] # Min-heap of bucket ids
         
     def _remove(self, node):
         prev = node.prev
@@ -41,31 +73,576 @@ class LRUCache:
         node.prev = prev
         node.next = self.tail
         self.tail.prev = node
+
+    def _bucket(self, expires_at):
+        return int(expires_at // self.bucket_width)
+
+    def _discard(self, node):
+        # Fully forget an entry: list, map, weight and expiry bucket
+        self._remove(node)
+        del self.cache[node.key]
+        self.total_weight -= node.weight
+        if node.expires_at is not None:
+            keys = self.expiry_buckets.get(self._bucket(node.expires_at))
+            if keys is not None: # None = bucket is being swept right now
+                keys.discard(node.key)
         
-    def get(self, key):
+    def get(self, key, default=-1):
         if key in self.cache:
             node = self.cache[key]
+            if node.expires_at is not None and node.expires_at <= self.clock():
+                self._discard(node) # Lazy expiry
+                return default
             # Move to end (Recently Used)
             self._remove(node)
             self._add_to_end(node)
             return node.val
-        return -1
+        return default
         
-    def put(self, key, value):
+    def put(self, key, value, ttl=None):
         if key in self.cache:
             # Update existing
-            self._remove(self.cache[key])
+            self._discard(self.cache[key])
+
+        weight = self.weigher(value) if self.weigher else 1
+        if self.max_weight is not None and weight > self.max_weight:
+            # Can never fit: caching it would flush everything else
+            if self.verbose:
+                print(f"   🚫 Rejected key: {key} (weight {weight} > {self.max_weight})")
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None
+        if ttl is not None:
+            expires_at = self.clock() + ttl
+            bucket = self._bucket(expires_at)
+            if bucket not in self.expiry_buckets:
+                self.expiry_buckets[bucket] = set()
+                heapq.heappush(self.bucket_heap, bucket)
+            self.expiry_buckets[bucket].add(key)
         
-        new_node = Node(key, value)
+        new_node = Node(key, value, weight, expires_at)
         self._add_to_end(new_node)
         self.cache[key] = new_node
+        self.total_weight += weight
+
+        if self.bucket_heap:
+            self.sweep() # Reclaim dead entries before evicting live ones
         
-        if len(self.cache) > self.capacity:
+        while len(self.cache) > self.capacity or (
+                self.max_weight is not None and self.total_weight > self.max_weight):
             # Evict LRU (First item after head)
             lru = self.head.next
+            self._discard(lru)
+            if self.verbose:
+                print(f"   🗑️ Evicted key: {lru.key}")
+
+    def sweep(self):
+        # Drop every entry whose bucket lies entirely in the past.
+        # Cost is O(expired entries), not O(cache size).
+        current = self._bucket(self.clock())
+        removed = 0
+        while self.bucket_heap and self.bucket_heap[0] < current:
+            bucket = heapq.heappop(self.bucket_heap)
+            for key in self.expiry_buckets.pop(bucket):
+                self._discard(self.cache[key])
+                removed += 1
+        return removed
+
+    def pop_lru(self):
+        # Remove and return the oldest node (None if empty)
+        lru = self.head.next
+        if lru is self.tail:
+            return None
+        self._discard(lru)
+        return lru
+
+# ==========================================
+# 📦 COMPACT LRU (Parallel Arrays + Free List)
+# ==========================================
+# PROBLEM: Every Node above is a full Python object with its own __dict__.
+# At millions of entries that is ~150+ bytes of overhead per key, and
+# millions of objects for the GC to walk.
+#
+# FIX: Same algorithm, but the linked list lives in flat arrays.
+# A "pointer" is just an int index into prev[] / next[].
+# keys[] / vals[] hold the payload. Slot 0 is the sentinel (head AND tail):
+#   next[0] -> oldest (LRU),  prev[0] -> newest (MRU)
+# Freed slots are chained through next[] (the free list), so no allocation
+# happens after warm-up.
+
+class CompactLRUCache:
+    def __init__(self, capacity, verbose=True):
+        self.capacity = capacity
+        self.verbose = verbose
+        self.cache = {} # Map Key -> slot index
+        size = capacity + 1
+        self.prev = array("l", [0]) * size
+        self.next = array("l", [0]) * size
+        self.keys = [None] * size
+        self.vals = [None] * size
+        self.free_head = 0 # 0 = free list empty
+        self.high_water = 0 # Slots 1..high_water have been handed out
+
+    def _remove(self, slot):
+        prev, nxt = self.prev[slot], self.next[slot]
+        self.next[prev] = nxt
+        self.prev[nxt] = prev
+
+    def _add_to_end(self, slot):
+        last = self.prev[0]
+        self.next[last] = slot
+        self.prev[slot] = last
+        self.next[slot] = 0
+        self.prev[0] = slot
+
+    def _alloc(self):
+        slot = self.free_head
+        if slot:
+            self.free_head = self.next[slot]
+            return slot
+        self.high_water += 1
+        return self.high_water
+
+    def _free(self, slot):
+        self.keys[slot] = None
+        self.vals[slot] = None # Drop references so values can be collected
+        self.next[slot] = self.free_head
+        self.free_head = slot
+
+    def get(self, key):
+        slot = self.cache.get(key)
+        if slot is None:
+            return -1
+        if self.next[slot] != 0: # Already newest? Skip the relink
+            self._remove(slot)
+            self._add_to_end(slot)
+        return self.vals[slot]
+
+    def put(self, key, value):
+        slot = self.cache.get(key)
+        if slot is not None:
+            # Update in place: no new allocation, just refresh recency
+            self.vals[slot] = value
+            self._remove(slot)
+            self._add_to_end(slot)
+            return
+        if self.capacity <= 0:
+            return # Nothing fits. Without this, eviction would pick the sentinel (slot 0)
+
+        if len(self.cache) >= self.capacity:
+            # Evict LRU (slot right after the sentinel) and recycle it
+            lru = self.next[0]
             self._remove(lru)
-            del self.cache[lru.key]
-            print(f"   🗑️ Evicted key: {lru.key}")
+            del self.cache[self.keys[lru]]
+            if self.verbose:
+                print(f"   🗑️ Evicted key: {self.keys[lru]}")
+            self._free(lru)
+
+        slot = self._alloc()
+        self.keys[slot] = key
+        self.vals[slot] = value
+        self._add_to_end(slot)
+        self.cache[key] = slot
+
+# ==========================================
+# 🔀 SHARDED LRU (Lock Striping)
+# ==========================================
+# PROBLEM: LRUCache is not thread-safe. One global lock fixes that but
+# serializes EVERY call -- even get() mutates the recency list, so there is
+# no "read lock" shortcut.
+#
+# FIX: N independent LRU segments, each with its own lock. hash(key) picks
+# the segment, so two threads only contend when they hit the same shard.
+# Trade-off: eviction is LRU *per shard*, not globally (same as Guava/Caffeine).
+
+_MISSING = object()
+
+class ShardedLRUCache:
+    def __init__(self, capacity, num_shards=16):
+        num_shards = max(1, min(num_shards, capacity))
+        self.capacity = capacity
+        # Spread capacity so the shards add up to exactly `capacity`
+        base, extra = divmod(capacity, num_shards)
+        self.shards = [LRUCache(base + (1 if i < extra else 0), verbose=False)
+                       for i in range(num_shards)]
+        self.locks = [threading.Lock() for _ in range(num_shards)]
+        # Per-shard counters: only ever touched under that shard's lock
+        self.hits = [0] * num_shards
+        self.misses = [0] * num_shards
+
+    def _shard(self, key):
+        return hash(key) % len(self.shards)
+
+    def get(self, key):
+        i = self._shard(key)
+        with self.locks[i]:
+            val = self.shards[i].get(key, _MISSING)
+            if val is _MISSING:
+                self.misses[i] += 1
+                return -1
+            self.hits[i] += 1
+            return val
+
+    def put(self, key, value):
+        i = self._shard(key)
+        with self.locks[i]:
+            self.shards[i].put(key, value)
+
+    def __len__(self):
+        return sum(len(shard.cache) for shard in self.shards)
+
+    def stats(self):
+        hits, misses = sum(self.hits), sum(self.misses)
+        total = hits + misses
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+
+class GlobalLockLRUCache:
+    # The baseline: one lock around the whole cache
+    def __init__(self, capacity):
+        self.lru = LRUCache(capacity, verbose=False)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self.lru.get(key)
+
+    def put(self, key, value):
+        with self.lock:
+            self.lru.put(key, value)
+
+# ==========================================
+# 🛡️ W-TinyLFU (Frequency-Gated Admission)
+# ==========================================
+# PROBLEM: LRU admits EVERYTHING. A batch job scanning 1M keys once each
+# pushes the whole hot set out, and the hit ratio collapses.
+#
+# FIX (Caffeine's W-TinyLFU):
+#   new key -> [ Window LRU (1%) ] --evicted--> candidate
+#                                                  |  sketch: freq(candidate) > freq(victim)?
+#                                   [ Main LRU (99%) ] <-- yes: admit, evict victim
+#                                                      <-- no:  drop candidate
+# The window gives brand-new keys a chance to build up frequency.
+# A Count-Min Sketch tracks frequency for MILLIONS of keys in a few KB.
+# Counters are periodically halved ("aging") so yesterday's hits fade.
+
+_HALVE = bytes(c >> 1 for c in range(256))
+
+class CountMinSketch:
+    def __init__(self, width, depth=4, sample_size=None):
+        self.width = 1 << max(4, (width - 1).bit_length()) # Power of 2 -> mask
+        self.mask = self.width - 1
+        self.depth = depth
+        self.table = bytearray(self.width * depth) # 4-bit-style counters, capped at 15
+        self.sample_size = sample_size or 10 * width
+        self.additions = 0
+
+    def _indexes(self, key):
+        # One 64-bit mix, split into two hashes (Kirsch-Mitzenmacher double hashing)
+        h = (hash(key) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        width, mask = self.width, self.mask
+        return [row * width + ((h1 + row * h2) & mask) for row in range(self.depth)]
+
+    def increment(self, key):
+        table = self.table
+        for i in self._indexes(key):
+            if table[i] < 15:
+                table[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key):
+        table = self.table
+        return min([table[i] for i in self._indexes(key)])
+
+    def _age(self):
+        self.table = bytearray(self.table.translate(_HALVE)) # Halve every counter in C
+        self.additions //= 2
+
+class TinyLFUCache:
+    def __init__(self, capacity, window_ratio=0.01):
+        if capacity < 2:
+            raise ValueError(f"TinyLFUCache needs capacity >= 2 (1 window + 1 main slot), got {capacity}")
+        self.capacity = capacity
+        self.window_capacity = max(1, int(capacity * window_ratio))
+        self.main_capacity = capacity - self.window_capacity # The two segments add up to capacity
+        self.window = LRUCache(self.window_capacity, verbose=False)
+        self.main = LRUCache(self.main_capacity, verbose=False)
+        # ~4 counters per entry per row, like Caffeine's FrequencySketch
+        self.sketch = CountMinSketch(4 * capacity, sample_size=10 * capacity)
+
+    def get(self, key):
+        # Frequency = hits + writes. A miss isn't counted: the put() that follows it is.
+        val = self.window.get(key, _MISSING)
+        if val is _MISSING:
+            val = self.main.get(key, _MISSING)
+        if val is _MISSING:
+            return -1
+        self.sketch.increment(key)
+        return val
+
+    def put(self, key, value):
+        self.sketch.increment(key) # Writes count too (like Caffeine), or write-only keys could never get in
+        if key in self.window.cache:
+            self.window.put(key, value)
+            return
+        if key in self.main.cache:
+            self.main.put(key, value)
+            return
+        if len(self.window.cache) >= self.window_capacity:
+            self._admit(self.window.pop_lru())
+        self.window.put(key, value)
+
+    def _admit(self, candidate):
+        if len(self.main.cache) < self.main_capacity:
+            self.main.put(candidate.key, candidate.val)
+            return
+        victim = self.main.head.next
+        if self.sketch.estimate(candidate.key) > self.sketch.estimate(victim.key):
+            self.main.pop_lru()
+            self.main.put(candidate.key, candidate.val)
+        # else: one-hit wonder, dropped without touching the hot set
+
+    def __len__(self):
+        return len(self.window.cache) + len(self.main.cache)
+
+# ==========================================
+# 🐘 SINGLE-FLIGHT LOADING (Thundering Herd)
+# ==========================================
+# PROBLEM: A hot key expires. 1,000 requests miss at the same instant and
+# ALL of them call the database for the same row.
+#
+# FIX: The first caller for a key becomes the "leader" and runs the loader.
+# Everyone else who misses while it is in flight waits on the leader's
+# future. 1,000 misses -> 1 backend call. (Go's singleflight, Guava's
+# LoadingCache.) Loader errors reach every waiter but are never cached.
+
+class SingleFlightCache:
+    def __init__(self, cache):
+        self.cache = cache # Any LRUCache; guarded by self.lock
+        self.lock = threading.Lock()
+        self.in_flight = {} # Key -> Future of the running load
+
+    def get_or_load(self, key, loader):
+        with self.lock:
+            val = self.cache.get(key, _MISSING)
+            if val is not _MISSING:
+                return val
+            future = self.in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self.in_flight[key] = Future()
+
+        if not is_leader:
+            return future.result() # Re-raises the leader's exception
+
+        try:
+            try:
+                val = loader(key) # Slow call runs OUTSIDE the lock
+                with self.lock:
+                    self.cache.put(key, val) # Can raise too, e.g. a weigher
+            finally:
+                with self.lock:
+                    del self.in_flight[key] # Before waking waiters: the next miss loads afresh
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        future.set_result(val)
+        return val
+
+class AsyncSingleFlightCache:
+    # Same idea on one event loop: no lock needed, the load is a shared Task
+    def __init__(self, cache):
+        self.cache = cache
+        self.in_flight = {} # Key -> Task
+
+    async def get_or_load(self, key, loader):
+        val = self.cache.get(key, _MISSING)
+        if val is not _MISSING:
+            return val
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self.in_flight[key] = task
+        # shield(): one impatient caller cancelling must not cancel everyone's load
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader):
+        try:
+            val = await loader(key)
+            self.cache.put(key, val)
+            return val
+        finally:
+            del self.in_flight[key]
+
+# ==========================================
+# 📊 BENCHMARKS
+# ==========================================
+def measure_memory(cache_cls, n):
+    keys = [f"key_{i}" for i in range(n)] # Allocated outside the trace
+    gc.collect()
+    tracked_before = len(gc.get_objects())
+    tracemalloc.start()
+    cache = cache_cls(n, verbose=False)
+    for k in keys:
+        cache.put(k, k)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Objects the cyclic GC has to walk on every full collection
+    gc_objects = len(gc.get_objects()) - tracked_before
+    return used / n, gc_objects
+
+def measure_ops_per_sec(cache_cls, capacity, ops):
+    rng = random.Random(42)
+    # Keyspace 2x capacity -> ~50% hit ratio and a steady stream of evictions
+    trace = [rng.randrange(capacity * 2) for _ in range(ops)]
+    cache = cache_cls(capacity, verbose=False)
+    start = time.perf_counter()
+    for i, k in enumerate(trace):
+        if i & 1:
+            cache.put(k, i)
+        else:
+            cache.get(k)
+    return ops / (time.perf_counter() - start)
+
+def measure_threaded_ops(cache, num_threads, ops, keyspace):
+    per_thread = ops // num_threads
+    barrier = threading.Barrier(num_threads + 1)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        trace = [rng.randrange(keyspace) for _ in range(per_thread)]
+        barrier.wait() # Everyone starts together
+        for i, k in enumerate(trace):
+            if cache.get(k) == -1:
+                cache.put(k, i)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(num_threads)]
+    for t in threads: t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads: t.join()
+    return per_thread * num_threads / (time.perf_counter() - start)
+
+def run_concurrency_benchmark(capacity=10_000, ops=48_000):
+    print(f"\n--- 🔀 Benchmark: {ops:,} get-or-put ops, capacity {capacity:,} ---")
+    print(f"{'Threads':>7} {'GlobalLock ops/s':>18} {'Sharded ops/s':>15}")
+    for num_threads in (1, 4, 16):
+        row = []
+        for cache in (GlobalLockLRUCache(capacity), ShardedLRUCache(capacity)):
+            row.append(measure_threaded_ops(cache, num_threads, ops, capacity * 2))
+        print(f"{num_threads:>7} {row[0]:>18,.0f} {row[1]:>15,.0f}")
+
+def zipf_trace(num_keys, length, rng, s=1.0):
+    cum_weights, total = [], 0.0
+    for rank in range(1, num_keys + 1):
+        total += 1 / rank ** s
+        cum_weights.append(total)
+    return rng.choices(range(num_keys), cum_weights=cum_weights, k=length)
+
+def scan_trace(num_keys, length, rng, scan_every=5_000, scan_length=2_000):
+    # Zipf traffic interrupted by batch jobs reading never-seen-again keys
+    trace = zipf_trace(num_keys, length, rng)
+    next_scan_key = num_keys
+    for start in range(scan_every, len(trace), scan_every):
+        trace[start:start] = range(next_scan_key, next_scan_key + scan_length)
+        next_scan_key += scan_length
+    return trace[:length]
+
+def replay(cache, trace):
+    hits = 0
+    start = time.perf_counter()
+    for k in trace:
+        if cache.get(k) == -1:
+            cache.put(k, k)
+        else:
+            hits += 1
+    return hits / len(trace), len(trace) / (time.perf_counter() - start)
+
+def run_admission_benchmark(capacity=500, num_keys=50_000, length=40_000):
+    rng = random.Random(7)
+    workloads = {"zipf": zipf_trace(num_keys, length, rng),
+                 "zipf+scans": scan_trace(num_keys, length, rng)}
+    print(f"\n--- 🛡️ Benchmark: trace replay, capacity {capacity:,}, {num_keys:,} keys ---")
+    print(f"{'Workload':<11} {'Cache':<14} {'Hit ratio':>10} {'Ops/sec':>12}")
+    for name, trace in workloads.items():
+        for cache in (LRUCache(capacity, verbose=False), TinyLFUCache(capacity)):
+            hit_ratio, ops_sec = replay(cache, trace)
+            print(f"{name:<11} {type(cache).__name__:<14} {hit_ratio:>10.1%} {ops_sec:>12,.0f}")
+
+def run_thundering_herd_benchmark(num_requests=1_000, latency=0.05):
+    print(f"\n--- 🐘 Benchmark: {num_requests:,} concurrent requests, same cold key ---")
+    print(f"{'Strategy':<28} {'Backend calls':>14} {'Wall time':>10}")
+
+    def run_threads(get_or_load):
+        calls = []
+        def loader(key):
+            calls.append(key)
+            time.sleep(latency) # Simulated DB query
+            return f"row:{key}"
+        barrier = threading.Barrier(num_requests)
+        def request():
+            barrier.wait()
+            get_or_load("user:42", loader)
+        threads = [threading.Thread(target=request) for _ in range(num_requests)]
+        start = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        return len(calls), time.perf_counter() - start
+
+    naive_cache, naive_lock = LRUCache(100, verbose=False), threading.Lock()
+    def naive_get_or_load(key, loader):
+        with naive_lock:
+            val = naive_cache.get(key, _MISSING)
+        if val is _MISSING:
+            val = loader(key)
+            with naive_lock:
+                naive_cache.put(key, val)
+        return val
+
+    async def run_async(get_or_load):
+        calls = []
+        async def loader(key):
+            calls.append(key)
+            await asyncio.sleep(latency)
+            return f"row:{key}"
+        start = time.perf_counter()
+        await asyncio.gather(*(get_or_load("user:42", loader) for _ in range(num_requests)))
+        return len(calls), time.perf_counter() - start
+
+    async_cache = LRUCache(100, verbose=False)
+    async def naive_async_get_or_load(key, loader):
+        val = async_cache.get(key, _MISSING)
+        if val is _MISSING:
+            val = await loader(key)
+            async_cache.put(key, val)
+        return val
+
+    results = [
+        ("threads: get / load / put", run_threads(naive_get_or_load)),
+        ("threads: SingleFlightCache", run_threads(SingleFlightCache(LRUCache(100, verbose=False)).get_or_load)),
+        ("asyncio: get / load / put", asyncio.run(run_async(naive_async_get_or_load))),
+        ("asyncio: AsyncSingleFlight", asyncio.run(run_async(AsyncSingleFlightCache(LRUCache(100, verbose=False)).get_or_load))),
+    ]
+    for name, (calls, elapsed) in results:
+        print(f"{name:<28} {calls:>14,} {elapsed:>9.3f}s")
+
+def run_benchmark(n=30_000, ops=100_000):
+    # Bump n to a few million to see production-scale numbers.
+    print(f"\n--- 📊 Benchmark: {n:,} entries, {ops:,} mixed get/put ---")
+    print(f"{'Implementation':<18} {'Bytes/entry':>12} {'GC objects':>12} {'Ops/sec':>12}")
+    for cls in (LRUCache, CompactLRUCache):
+        per_entry, gc_objects = measure_memory(cls, n)
+        ops_sec = measure_ops_per_sec(cls, n // 10, ops)
+        print(f"{cls.__name__:<18} {per_entry:>12.0f} {gc_objects:>12,} {ops_sec:>12,.0f}")
 
 if __name__ == "__main__":
     print("--- 🧠 LRU Cache Demo (O(1)) ---")
@@ -83,3 +660,44 @@ if __name__ == "__main__":
     print(f"Get C: {lru.get('C')}")
     
     print("\n🏆 Insight: O(1) implies Hash Map. Ordering implies Linked List. Using BOTH is the trick.")
+
+    run_benchmark()
+    print("\n🏆 Insight: Same O(1) algorithm, fewer bytes per key and ~zero objects for the GC to scan.")
+    print("   In CPython the array indexing costs some raw speed; the win is memory + GC pauses.")
+    print("   🏢 Real World: **Memcached** slabs and **Caffeine** pre-size their entry tables the same way.")
+
+    print("\n--- ⚖️ Weighted + TTL Demo ---")
+    fake_now = [0.0]
+    budget = LRUCache(100, weigher=len, max_weight=10, ttl=5, clock=lambda: fake_now[0])
+    budget.put("small", "abc") # weight 3
+    budget.put("medium", "abcdef") # weight 6
+    print("Put 'big' (weight 5) -> total 14 > 10, LRU entries go...")
+    budget.put("big", "abcde")
+    print(f"Total weight: {budget.total_weight} / {budget.max_weight}")
+    budget.put("session", "tok", ttl=1)
+    fake_now[0] = 3.0 # 3 seconds later
+    print(f"Get session after 3s: {budget.get('session')} (Expired lazily)")
+    fake_now[0] = 7.0
+    budget.put("fresh", "x")
+    print(f"Keys after sweep at t=7s: {list(budget.cache)} (TTL-5 entries swept, no scan)")
+    print("🏆 Insight: Budget by bytes, not by count. Expire by bucket, not by scanning.")
+    print("   🏢 Real World: **Caffeine** (weigher + timer wheel), **Redis** (maxmemory + active expiry).")
+
+    run_admission_benchmark()
+    print("\n🏆 Insight: LRU asks 'was it used recently?'. TinyLFU also asks 'is it used OFTEN?'.")
+    print("   Scans stop flushing the hot set; the sketch costs a few bytes per key, not an entry.")
+    print("   Pure-Python hashing makes each op slower, but a miss costs a DB round-trip (~1ms).")
+    print("   🏢 Real World: **Caffeine** (Java), **Ristretto** (Dgraph/Go), **Cassandra** key cache.")
+
+    sharded = ShardedLRUCache(capacity=4, num_shards=2)
+    for k in "ABCDEF": sharded.put(k, k.lower())
+    for k in "ABCDEF": sharded.get(k)
+    print(f"\n🔀 Sharded cache stats: {sharded.stats()}")
+    run_concurrency_benchmark()
+    print("\n🏆 Insight: With the GIL, threads never run Python in parallel, so both columns stay flat.")
+    print("   Sharding removes the lock convoy; on free-threaded Python (3.13t) it is what lets reads scale.")
+    print("   🏢 Real World: **Java ConcurrentHashMap** (lock striping), **Guava Cache** segments, **Memcached** item locks.")
+
+    run_thundering_herd_benchmark()
+    print("\n🏆 Insight: Coalesce misses per key. The DB sees ONE query per expiry, not one per user.")
+    print("   🏢 Real World: **Go singleflight** (groupcache), **Guava LoadingCache**, **Varnish** request coalescing.")
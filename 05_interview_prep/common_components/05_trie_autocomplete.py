@@ -1,4 +1,12 @@
 # 05_trie_autocomplete.py
+import heapq
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+import tracemalloc
 
 # ==========================================
 # 🌳 TRIE (Prefix Tree)
@@ -8,24 +16,57 @@
 # Scanning a list of 1B words is O(N). Too slow.
 # Trie search is O(L) where L is length of prefix (e.g., 2). BLAZING FAST.
 
+#
+# RANKING: Every node caches the top-k completions of its subtree, ordered
+# by how often each word was inserted. Counts only ever go UP, so one pass
+# down the word's path on insert keeps every cache exact:
+#   insert/bump: O(L * k)      search_prefix: O(len(prefix)) -- no DFS
+
 class TrieNode:
     def __init__(self):
         self.children = {}
         self.is_end_of_word = False
-        self.freq = 0 # For ranking suggestions
+        self.freq = 0 # How many inserts passed through this prefix
+        self.count = 0 # How many times THIS word was inserted
+        self.top = [] # Best k (count, word) in this subtree, highest first
+
+def _offer(top, entry, k, is_new):
+    # Merge a (count, word) whose count just went up into a top-k list
+    count, word = entry
+    if len(top) >= k and count <= top[-1][0]:
+        return # Not popular enough for this subtree (and so not listed in it)
+    if not is_new: # A brand-new word can't already be listed
+        for i, (_, w) in enumerate(top):
+            if w == word:
+                del top[i]
+                break
+    i = len(top)
+    while i > 0 and top[i - 1][0] < count: # Ties: older entry stays ahead
+        i -= 1
+    top.insert(i, entry)
+    del top[k:]
 
 class Trie:
-    def __init__(self):
+    def __init__(self, k=5):
         self.root = TrieNode()
+        self.k = k # Suggestions returned (and cached) per prefix
         
-    def insert(self, word):
+    def insert(self, word, count=1):
+        # Inserting an existing word again bumps its frequency
         node = self.root
+        path = [node]
         for char in word:
             if char not in node.children:
                 node.children[char] = TrieNode()
             node = node.children[char]
             node.freq += 1 # This prefix is more popular now
+            path.append(node)
         node.is_end_of_word = True
+        is_new = node.count == 0
+        node.count += count
+        entry = (node.count, word) # One tuple, shared by every cache on the path
+        for n in path:
+            _offer(n.top, entry, self.k, is_new)
         
     def search_prefix(self, prefix):
         node = self.root
@@ -34,19 +75,414 @@ class Trie:
                 return []
             node = node.children[char]
         
-        # DFS to find all words from this node
+        # Precomputed: no walk over the subtree
+        return [word for _, word in node.top]
+
+    def search_fuzzy(self, prefix, max_dist=1):
+        # Typo-tolerant typeahead: "pyhton" still suggests "python tutorial".
+        # Walk the trie carrying one Levenshtein DP row per node:
+        #   row[j] = edit distance between this node's path and prefix[:j]
+        # A child's row is computed from its parent's in O(len(prefix)), so
+        # shared prefixes share work. Branches whose best cell is already
+        # > max_dist can never recover -> pruned before we descend.
+        best = {} # word -> (distance, count)
+        stack = [(self.root, list(range(len(prefix) + 1)))]
+        while stack:
+            node, row = stack.pop()
+            dist = row[-1] # Distance between this path and the WHOLE prefix
+            if dist <= max_dist:
+                for count, word in node.top:
+                    if word not in best or dist < best[word][0]:
+                        best[word] = (dist, count)
+            for char, child in node.children.items():
+                new_row = [row[0] + 1]
+                for j in range(1, len(row)):
+                    cost = 0 if prefix[j - 1] == char else 1
+                    new_row.append(min(new_row[j - 1] + 1, # Insertion
+                                       row[j] + 1, # Deletion
+                                       row[j - 1] + cost)) # Substitution / match
+                if min(new_row) <= max_dist:
+                    stack.append((child, new_row))
+        # Closer first, then more popular
+        ranked = sorted(best.items(), key=lambda e: (e[1][0], -e[1][1]))
+        return [word for word, _ in ranked[:self.k]]
+
+# ==========================================
+# 🗜️ RADIX TRIE (Path Compression)
+# ==========================================
+# PROBLEM: One TrieNode (+ a children dict + an instance __dict__) PER
+# CHARACTER. A few million queries -> tens of millions of objects -> GBs.
+# Most of those nodes have exactly ONE child: "h-o-w- -t-o- -c-o-o-k".
+#
+# FIX: Collapse single-child chains into one edge holding a SUBSTRING.
+#   Trie:  r -> o -> m -> a -> n -> e      (6 nodes)
+#   Radix: "roman" -> "e" / "us"           (3 nodes)
+# Nodes use __slots__ (no per-node __dict__) and leaves have no dict at all.
+
+class RadixNode:
+    __slots__ = ("label", "children", "is_end_of_word", "freq", "count", "top")
+
+    def __init__(self, label=""):
+        self.label = label # Edge text leading INTO this node
+        self.children = None # First char of child label -> RadixNode
+        self.is_end_of_word = False
+        self.freq = 0
+        self.count = 0
+        self.top = [] # Same ranked top-k cache as TrieNode
+
+class RadixTrie:
+    def __init__(self, k=5):
+        self.root = RadixNode()
+        self.k = k
+
+    def insert(self, word, count=1):
+        node = self.root
+        path = [node]
+        i = 0
+        while i < len(word):
+            child = node.children.get(word[i]) if node.children else None
+            if child is None:
+                # No edge starts with this char: the whole suffix becomes ONE edge
+                leaf = RadixNode(word[i:])
+                leaf.freq = 1
+                if node.children is None:
+                    node.children = {}
+                node.children[word[i]] = leaf
+                path.append(leaf)
+                node = leaf
+                break
+
+            label = child.label
+            j, limit = 0, min(len(label), len(word) - i)
+            while j < limit and label[j] == word[i + j]:
+                j += 1
+            if j < len(label):
+                # Diverged mid-edge: split "roman" into "rom" -> "an"
+                mid = RadixNode(label[:j])
+                mid.freq = child.freq
+                mid.top = list(child.top) # Same subtree -> same ranking
+                child.label = label[j:]
+                mid.children = {child.label[0]: child}
+                node.children[word[i]] = mid
+                child = mid
+            child.freq += 1
+            node = child
+            path.append(node)
+            i += j
+        node.is_end_of_word = True
+        is_new = node.count == 0
+        node.count += count
+        entry = (node.count, word)
+        for n in path:
+            _offer(n.top, entry, self.k, is_new)
+
+    def search_prefix(self, prefix):
+        node = self.root
+        i = 0
+        while i < len(prefix):
+            child = node.children.get(prefix[i]) if node.children else None
+            if child is None:
+                return []
+            label = child.label
+            rest = prefix[i:]
+            if rest.startswith(label):
+                i += len(label)
+            elif label.startswith(rest):
+                i = len(prefix) # Prefix ends in the middle of this edge
+            else:
+                return []
+            node = child
+        return [word for _, word in node.top]
+
+# ==========================================
+# 💾 MMAP TRIE (Build Once, Load Instantly)
+# ==========================================
+# PROBLEM: Rebuilding the Trie with millions of insert() calls on EVERY
+# process start takes minutes, and every worker holds its own copy.
+#
+# FIX: Build offline from a SORTED (word, count) stream, write a flat binary
+# file, and mmap it. Queries read bytes straight out of the page cache --
+# no Python objects are created until a suggestion is returned, and N worker
+# processes share ONE copy of the pages.
+#
+# Sorted input makes the build a single streaming pass: words sharing a
+# prefix arrive together, so when the next word diverges, the nodes below
+# the divergence point are complete and get written (children before
+# parents, so a parent always knows its children's offsets).
+#
+# FILE LAYOUT (little-endian):
+#   header: b"TRIE" | version u16 | k u16 | root_offset u32
+#   word:   byte_len u16 | utf-8 bytes
+#   node:   n_children u16 | n_top u8
+#           n_children x (codepoint u32, child_offset u32)   <- sorted, binary search
+#           n_top      x (count u32, word_offset u32)        <- precomputed ranking
+
+_HEADER = struct.Struct("<4sHHI")
+_NODE = struct.Struct("<HB")
+_PAIR = struct.Struct("<II")
+_LEN = struct.Struct("<H")
+_MAGIC = b"TRIE"
+
+class _OpenNode:
+    __slots__ = ("char", "children", "top")
+
+    def __init__(self, char):
+        self.char = char
+        self.children = [] # (codepoint, offset), already in sorted order
+        self.top = [] # (count, word_offset), highest first
+
+def build_trie_file(path, sorted_items, k=5):
+    # Field widths come from the layout above: reject what can't fit BEFORE writing it
+    if not 1 <= k <= 0xFF:
+        raise ValueError(f"k must fit n_top u8 (1..255), got {k}")
+    try:
+        _write_trie_file(path, sorted_items, k)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path) # Never leave a half-written file for a worker to mmap
+        raise
+
+def _write_trie_file(path, sorted_items, k):
+    with open(path, "wb") as f:
+        f.write(b"\0" * _HEADER.size) # Patched at the end
+
+        def close(node, parent):
+            # All of node's children are written: write node, hand ranking up
+            offset = f.tell()
+            f.write(_NODE.pack(len(node.children), len(node.top)))
+            for pair in node.children + node.top:
+                f.write(_PAIR.pack(*pair))
+            if parent is not None:
+                parent.children.append((ord(node.char), offset))
+                merged = parent.top + node.top
+                merged.sort(key=lambda e: -e[0]) # Stable: earlier words win ties
+                parent.top = merged[:k]
+            return offset
+
+        stack = [_OpenNode("")] # Root + the path of the previous word
+        prev = None
+        for word, count in sorted_items:
+            if prev is not None and word <= prev:
+                raise ValueError(f"input must be sorted and unique: {prev!r} then {word!r}")
+            if not 0 <= count <= 0xFFFFFFFF:
+                raise ValueError(f"count must fit u32: {word!r} has {count}")
+            data = word.encode()
+            if len(data) > 0xFFFF:
+                raise ValueError(f"word must fit byte_len u16: {word[:20]!r}... is {len(data)} bytes")
+            common = 0
+            if prev is not None:
+                limit = min(len(prev), len(word))
+                while common < limit and prev[common] == word[common]:
+                    common += 1
+            while len(stack) > common + 1:
+                node = stack.pop()
+                close(node, stack[-1])
+            for char in word[common:]:
+                stack.append(_OpenNode(char))
+
+            word_offset = f.tell()
+            f.write(_LEN.pack(len(data)) + data)
+            end = stack[-1]
+            end.top.insert(0, (count, word_offset)) # A word ranks before its own extensions
+            del end.top[k:]
+            prev = word
+
+        while len(stack) > 1:
+            node = stack.pop()
+            close(node, stack[-1])
+        root_offset = close(stack.pop(), None)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, 1, k, root_offset))
+
+class MappedTrie:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _version, self.k, self.root = _HEADER.unpack_from(self.mm, 0)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a trie file")
+
+    def _child(self, offset, codepoint):
+        # Binary search the sorted edge table, reading straight from the map
+        n_children, _ = _NODE.unpack_from(self.mm, offset)
+        base = offset + _NODE.size
+        lo, hi = 0, n_children
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cp, child = _PAIR.unpack_from(self.mm, base + mid * _PAIR.size)
+            if cp == codepoint:
+                return child
+            if cp < codepoint:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def search_prefix(self, prefix):
+        offset = self.root
+        for char in prefix:
+            offset = self._child(offset, ord(char))
+            if offset is None:
+                return []
+        n_children, n_top = _NODE.unpack_from(self.mm, offset)
+        base = offset + _NODE.size + n_children * _PAIR.size
         results = []
-        self._dfs(node, prefix, results)
+        for i in range(n_top):
+            _, word_offset = _PAIR.unpack_from(self.mm, base + i * _PAIR.size)
+            (length,) = _LEN.unpack_from(self.mm, word_offset)
+            start = word_offset + _LEN.size
+            results.append(self.mm[start:start + length].decode())
         return results
-        
-    def _dfs(self, node, prefix, results):
-        if len(results) >= 5: return # Top 5 only
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ==========================================
+# 📊 BENCHMARKS
+# ==========================================
+VOCAB = ["how", "to", "cook", "pasta", "python", "tutorial", "weather", "today",
+         "near", "me", "best", "pizza", "cheap", "flights", "new", "york",
+         "london", "news", "score", "movie", "times", "recipe", "for", "kids"]
+
+def make_corpus(n, seed=1):
+    # Search-log-like queries: shared leading words, long unique tails
+    rng = random.Random(seed)
+    corpus = set()
+    while len(corpus) < n:
+        words = rng.choices(VOCAB, k=rng.randint(2, 4))
+        corpus.add(" ".join(words) + f" {rng.randrange(100_000)}")
+    return sorted(corpus)
+
+def build(trie_cls, corpus):
+    trie = trie_cls()
+    for q in corpus:
+        trie.insert(q)
+    return trie
+
+def measure_build(trie_cls, corpus):
+    start = time.perf_counter()
+    build(trie_cls, corpus)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start() # Separate pass: tracing slows allocation down
+    trie = build(trie_cls, corpus)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return trie, used, elapsed
+
+def run_memory_benchmark(n=8_000):
+    # Bump n to a few million to reproduce the "gigabytes" problem.
+    corpus = make_corpus(n)
+    total_chars = sum(len(q) for q in corpus)
+    print(f"\n--- 📊 Benchmark: {n:,} queries ({total_chars:,} chars) ---")
+    print(f"{'Implementation':<12} {'Memory':>10} {'Bytes/query':>12} {'Build time':>11}")
+    for cls in (Trie, RadixTrie):
+        _, used, elapsed = measure_build(cls, corpus)
+        print(f"{cls.__name__:<12} {used / 1e6:>8.1f}MB {used / n:>12.0f} {elapsed:>10.3f}s")
+
+def rank_by_walking(trie, prefix):
+    # The no-cache way to get a RANKED answer: visit the whole subtree, then sort
+    node = trie.root
+    for char in prefix:
+        if char not in node.children:
+            return []
+        node = node.children[char]
+    found, stack = [], [(node, prefix)]
+    while stack:
+        node, word = stack.pop()
         if node.is_end_of_word:
-            results.append(prefix)
-            
-        # Sort children by frequency (optional optimization)
+            found.append((node.count, word))
         for char, child in node.children.items():
-            self._dfs(child, prefix + char, results)
+            stack.append((child, word + char))
+    return [word for _, word in heapq.nlargest(trie.k, found)]
+
+def time_per_call(search, prefixes, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for p in prefixes:
+            search(p)
+    return (time.perf_counter() - start) / (repeats * len(prefixes))
+
+def run_latency_benchmark(n=8_000):
+    rng = random.Random(2)
+    trie = Trie()
+    for q in make_corpus(n):
+        trie.insert(q, count=int(rng.paretovariate(1.2))) # Heavy-tailed popularity
+    one_char = sorted(trie.root.children)
+    two_char = sorted(a + b for a in one_char for b in trie.root.children[a].children)
+    print(f"\n--- ⏱️ Benchmark: ranked top-{trie.k} over {n:,} queries ---")
+    print(f"{'Prefixes':<10} {'Walk+sort':>12} {'Cached top-k':>14}")
+    for label, prefixes in (("1 char", one_char), ("2 chars", two_char)):
+        sample = prefixes[:5] # Walking is slow; time both on the SAME prefixes
+        walk = time_per_call(lambda p: rank_by_walking(trie, p), sample, repeats=1)
+        cached = time_per_call(trie.search_prefix, sample, repeats=200)
+        row = (walk, cached)
+        print(f"{label:<10} {row[0] * 1e6:>10.0f}us {row[1] * 1e6:>12.1f}us")
+
+def run_startup_benchmark(n=8_000):
+    rng = random.Random(3)
+    items = [(q, int(rng.paretovariate(1.2))) for q in make_corpus(n)]
+    prefix = items[0][0][:2]
+    print(f"\n--- 💾 Benchmark: startup over {n:,} queries ---")
+    print(f"{'Strategy':<24} {'Startup':>10} {'First query':>12}")
+
+    start = time.perf_counter()
+    trie = Trie()
+    for word, count in items:
+        trie.insert(word, count)
+    startup = time.perf_counter() - start
+    start = time.perf_counter()
+    trie.search_prefix(prefix)
+    print(f"{'insert() per word':<24} {startup * 1e3:>8.1f}ms {(time.perf_counter() - start) * 1e6:>10.1f}us")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.trie")
+        start = time.perf_counter()
+        build_trie_file(path, items) # Offline, once per release
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        with MappedTrie(path) as mapped:
+            startup = time.perf_counter() - start
+            start = time.perf_counter()
+            mapped.search_prefix(prefix)
+            first_query = time.perf_counter() - start
+            print(f"{'mmap (open only)':<24} {startup * 1e3:>8.2f}ms {first_query * 1e6:>10.1f}us")
+        print(f"   (offline bulk build: {build * 1e3:.1f}ms -> {os.path.getsize(path) / 1e6:.1f}MB file)")
+
+def make_typo(text, rng):
+    i = rng.randrange(len(text))
+    edit = rng.choice(("swap", "drop", "replace"))
+    if edit == "swap" and i + 1 < len(text):
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if edit == "drop" and len(text) > 1:
+        return text[:i] + text[i + 1:]
+    return text[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + text[i + 1:]
+
+def run_fuzzy_benchmark(n=8_000, queries=50):
+    rng = random.Random(4)
+    corpus = make_corpus(n)
+    trie = Trie()
+    for q in corpus:
+        trie.insert(q, count=int(rng.paretovariate(1.2)))
+    typos = [make_typo(rng.choice(corpus)[:rng.randint(3, 8)], rng) for _ in range(queries)]
+    print(f"\n--- 🔤 Benchmark: fuzzy prefix search over {n:,} queries ---")
+    print(f"{'Max edits':>9} {'Avg':>9} {'p99':>9} {'Hit rate':>9}")
+    for max_dist in (1, 2):
+        timings, found = [], 0
+        for typo in typos:
+            start = time.perf_counter()
+            found += bool(trie.search_fuzzy(typo, max_dist))
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{max_dist:>9} {sum(timings) / len(timings) * 1e3:>7.2f}ms {p99 * 1e3:>7.2f}ms {found / len(typos):>9.0%}")
 
 if __name__ == "__main__":
     print("--- 🌳 Trie Typeahead Demo ---")
@@ -61,3 +497,27 @@ if __name__ == "__main__":
     
     print("\n🏆 Insight: Tries compress shared prefixes. 'Car' and 'Cat' share 'Ca'.")
     print("   🏢 Real World: **Google Search**, **Algolia**, **ElasticSearch** (FSTs).")
+
+    radix = RadixTrie()
+    for w in words: radix.insert(w)
+    print(f"\n🗜️ RadixTrie edges under 'ca': {[c.label for c in radix.root.children['c'].children.values()]}")
+    print(f"RadixTrie suggestions for '{query}': {radix.search_prefix(query)}")
+    run_memory_benchmark()
+    print("\n🏆 Insight: Memory follows NODE count, not character count. Compress the chains.")
+    print("   🏢 Real World: **Linux** routing tables & **Redis** Streams (rax) use radix trees.")
+
+    trie.insert("cake", count=10) # "cake" trends
+    print(f"\nAfter 10 searches for 'cake': {trie.search_prefix('ca')}")
+    run_latency_benchmark()
+    print("\n🏆 Insight: Pay at write time (update k entries per node), read in O(len(prefix)).")
+    print("   Short prefixes are the MOST popular queries AND the biggest subtrees -- cache them.")
+
+    run_startup_benchmark()
+    print("\n🏆 Insight: Don't rebuild at boot. Build once, mmap, and let the OS page cache share it.")
+    print("   🏢 Real World: **Lucene/Elasticsearch** FST files and **marisa-trie** are both mmap-loaded.")
+
+    print(f"\n🔤 Exact search for 'cra': {trie.search_prefix('cra')}")
+    print(f"Fuzzy search for 'cra' (1 typo): {trie.search_fuzzy('cra', max_dist=1)}")
+    run_fuzzy_benchmark()
+    print("\n🏆 Insight: Don't compare the typo with every word. Share DP rows along the trie and prune.")
+    print("   🏢 Real World: **Lucene** FuzzyQuery (Levenshtein automata), **Algolia** typo tolerance.")
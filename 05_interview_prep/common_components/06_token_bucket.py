@@ -1,6 +1,13 @@
 # 06_token_bucket.py
+import asyncio
+import importlib.util
+import os
+import random
 import time
 import threading
+import tracemalloc
+from array import array
+from collections import deque
 
 # ==========================================
 # 🪣 TOKEN BUCKET (Rate Limiter Algorithm)
@@ -18,6 +25,7 @@ class TokenBucket:
         self.refill_rate = refill_rate # Tokens per second
         self.last_refill = time.time()
         self.lock = threading.Lock()
+        self.waiters = None # FIFO deque of asyncio futures, created on first acquire()
         
     def _refill(self):
         now = time.time()
@@ -36,6 +44,451 @@ class TokenBucket:
                 return True # Allowed
             return False # Denied
 
+    def consume_many(self, requests):
+        # Batch path: decide N requests under ONE lock + ONE clock read
+        # (e.g. a gateway flushing everything that arrived in the last 1ms)
+        results = []
+        with self.lock:
+            self._refill()
+            for tokens in requests:
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    results.append(True)
+                else:
+                    results.append(False)
+        return results
+
+    async def acquire(self, tokens=1):
+        # WAIT instead of failing. No polling: the deficit tells us EXACTLY
+        # how long until enough tokens exist, so we sleep that long once.
+        # Waiters queue FIFO, so a big request isn't starved by small ones.
+        # (Sync consume() callers don't queue; they only see leftovers.)
+        if tokens > self.capacity:
+            raise ValueError(f"can never acquire {tokens} tokens (capacity {self.capacity})")
+        turn = asyncio.get_running_loop().create_future()
+        if self.waiters is None:
+            self.waiters = deque()
+        self.waiters.append(turn)
+        try:
+            if self.waiters[0] is not turn:
+                await turn # Woken exactly once, when everyone ahead is served
+            while True:
+                with self.lock:
+                    self._refill()
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        return
+                    wait = (tokens - self.tokens) / self.refill_rate
+                await asyncio.sleep(wait)
+        finally:
+            # Served or cancelled: pass the turn to the next waiter
+            was_head = self.waiters[0] is turn
+            self.waiters.remove(turn)
+            if was_head and self.waiters and not self.waiters[0].done():
+                self.waiters[0].set_result(None)
+
+# ==========================================
+# 🗄️ KEYED BUCKET STORE (Millions of API Keys)
+# ==========================================
+# PROBLEM: One TokenBucket object (+ its own Lock) per API key is ~250 bytes.
+# 10M keys -> 2.5GB, and keys that called once last month stay forever.
+#
+# FIX:
+# 1. COMPACT STATE: Each key is 2 floats (tokens, last_refill) in flat
+#    arrays. A dict maps key -> slot. No per-key objects, no per-key locks.
+# 2. LAZY REFILL: No background refiller. Tokens are topped up from the
+#    elapsed time only when the key is actually used.
+# 3. STRIPED LOCKS: hash(key) picks one of N stripes, each with its own
+#    lock + arrays. Threads only contend on the same stripe.
+# 4. IDLE EVICTION: A key idle for capacity / refill_rate seconds is FULL
+#    again -- exactly like a brand-new key. Dropping it loses nothing.
+
+class _Stripe:
+    __slots__ = ("lock", "slots", "keys", "tokens", "last", "free")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = {} # Key -> slot index
+        self.keys = [] # Slot index -> key (None = free)
+        self.tokens = array("d")
+        self.last = array("d")
+        self.free = [] # Recycled slot indices
+
+class TokenBucketStore:
+    def __init__(self, capacity, refill_rate, stripes=64, idle_timeout=None, clock=time.monotonic):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.idle_timeout = capacity / refill_rate if idle_timeout is None else idle_timeout
+        self.clock = clock
+        self.stripes = [_Stripe() for _ in range(stripes)]
+
+    def _slot(self, stripe, key, now):
+        # Caller holds stripe.lock. New keys start with a full bucket.
+        i = stripe.slots.get(key)
+        if i is not None:
+            return i
+        if stripe.free:
+            i = stripe.free.pop()
+            stripe.keys[i] = key
+            stripe.tokens[i] = self.capacity
+            stripe.last[i] = now
+        else:
+            i = len(stripe.keys)
+            stripe.keys.append(key)
+            stripe.tokens.append(self.capacity)
+            stripe.last.append(now)
+        stripe.slots[key] = i
+        return i
+
+    def _refill(self, stripe, i, now):
+        elapsed = now - stripe.last[i]
+        if elapsed > 0: # Another thread may have read a later clock first
+            stripe.tokens[i] = min(self.capacity, stripe.tokens[i] + elapsed * self.refill_rate)
+            stripe.last[i] = now
+
+    def consume(self, key, tokens=1):
+        stripe = self.stripes[hash(key) % len(self.stripes)]
+        now = self.clock()
+        with stripe.lock:
+            i = self._slot(stripe, key, now)
+            self._refill(stripe, i, now)
+            if stripe.tokens[i] >= tokens:
+                stripe.tokens[i] -= tokens
+                return True # Allowed
+            return False # Denied
+
+    def refund(self, key, tokens=1):
+        # Give back tokens from an admitted request that was rolled back
+        stripe = self.stripes[hash(key) % len(self.stripes)]
+        with stripe.lock:
+            i = stripe.slots.get(key)
+            if i is not None: # Evicted keys are full already
+                stripe.tokens[i] = min(self.capacity, stripe.tokens[i] + tokens)
+
+    def evict_idle(self):
+        # Call periodically (e.g. from a timer). Locks one stripe at a time.
+        now = self.clock()
+        removed = 0
+        for stripe in self.stripes:
+            with stripe.lock:
+                idle = [k for k, i in stripe.slots.items() if now - stripe.last[i] >= self.idle_timeout]
+                for key in idle:
+                    i = stripe.slots.pop(key)
+                    stripe.keys[i] = None
+                    stripe.free.append(i)
+                removed += len(idle)
+        return removed
+
+    def __len__(self):
+        return sum(len(stripe.slots) for stripe in self.stripes)
+
+class DictOfBuckets:
+    # The baseline: one TokenBucket object per key
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, tokens=1):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.setdefault(key, TokenBucket(self.capacity, self.refill_rate))
+        return bucket.consume(tokens)
+
+# ==========================================
+# 📐 GCRA (Generic Cell Rate Algorithm)
+# ==========================================
+# SAME limits as a token bucket (rate + burst), but the state per key is ONE
+# float: the "Theoretical Arrival Time" (TAT) -- when this key's NEXT request
+# would be perfectly on schedule if it sent at exactly `rate`.
+#
+#   interval T = 1 / rate        burst window = burst * T
+#   request of n: new_tat = max(tat, now) + n * T
+#                 allowed if new_tat - now <= burst window
+#                 else retry_after = new_tat - burst window - now
+#
+# No token float, no last_refill, no per-key lock. A monotonic clock means an
+# NTP step can't hand out (or swallow) a burst. tat <= now == "bucket full",
+# so those keys can be dropped for free.
+
+class GCRALimiter:
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.interval = 1 / rate
+        self.burst = burst
+        self.window = burst * self.interval
+        self.clock = clock
+        self.tat = {} # Key -> theoretical arrival time
+        self.lock = threading.Lock()
+
+    def check(self, key, tokens=1):
+        # Returns (allowed, retry_after_seconds)
+        if tokens > self.burst:
+            # No Retry-After would ever be honoured: fail loudly, like TokenBucket.acquire()
+            raise ValueError(f"can never allow {tokens} tokens (burst {self.burst})")
+        now = self.clock()
+        with self.lock:
+            tat = self.tat.get(key, now)
+            if tat < now:
+                tat = now # Idle long enough: bucket is full
+            new_tat = tat + tokens * self.interval
+            allow_at = new_tat - self.window
+            if allow_at > now:
+                return False, allow_at - now # Denied: don't move the schedule
+            self.tat[key] = new_tat
+            return True, 0.0
+
+    def consume(self, key, tokens=1):
+        return self.check(key, tokens)[0]
+
+    def evict_idle(self):
+        now = self.clock()
+        with self.lock:
+            idle = [k for k, tat in self.tat.items() if tat <= now]
+            for k in idle:
+                del self.tat[k]
+        return len(idle)
+
+# ==========================================
+# 🏛️ HIERARCHICAL LIMITS (User -> Tenant -> Global)
+# ==========================================
+# SCENARIO: alice may send 10 req/s, her company (tenant) 100 req/s, the
+# whole API 1000 req/s. A request must pass ALL three or debit NONE.
+#
+# NAIVE: One big lock around three buckets -> every request in the system
+# is serialized, even users that share nothing.
+#
+# ALSO NAIVE: Debit level by level and refund on denial. In between, other
+# requests see tokens that are about to come back and get wrongly denied.
+#
+# FIX: Lock only the stripes THIS request touches -- one per level -- in a
+# fixed global order (level, then stripe index), so two requests can never
+# wait on each other in a cycle. Check every level, then debit them all,
+# then release. One atomic decision, and users on different stripes still
+# run in parallel up to the shared global key (which every design locks).
+
+class HierarchicalLimiter:
+    def __init__(self, levels, stripes=64):
+        # levels: [(name, capacity, refill_rate), ...] innermost first
+        self.names = [name for name, _, _ in levels]
+        self.stores = [TokenBucketStore(capacity, rate, stripes=stripes)
+                       for _, capacity, rate in levels]
+
+    def _check_keys(self, keys):
+        # zip() would silently skip the levels without a key
+        if len(keys) != len(self.stores):
+            raise ValueError(f"Expected {len(self.stores)} keys ({', '.join(self.names)}), got {len(keys)}")
+
+    def consume(self, keys, tokens=1):
+        # keys: one per level, e.g. ("alice", "acme", "global")
+        return self.denied_by(keys, tokens) is None
+
+    def denied_by(self, keys, tokens=1):
+        # Returns the name of the level that said no (None = allowed everywhere)
+        self._check_keys(keys)
+        # One stripe per level, already in (level, stripe) order: each level is its own store
+        stripes = [store.stripes[hash(key) % len(store.stripes)] for store, key in zip(self.stores, keys)]
+        for stripe in stripes:
+            stripe.lock.acquire()
+        try:
+            slots = []
+            for level, (store, stripe, key) in enumerate(zip(self.stores, stripes, keys)):
+                now = store.clock()
+                i = store._slot(stripe, key, now)
+                store._refill(stripe, i, now)
+                if stripe.tokens[i] < tokens:
+                    return self.names[level] # Nothing debited yet
+                slots.append(i)
+            for stripe, i in zip(stripes, slots):
+                stripe.tokens[i] -= tokens
+            return None
+        finally:
+            for stripe in reversed(stripes):
+                stripe.lock.release()
+
+    def refund(self, keys, tokens=1):
+        # The request was admitted but cancelled downstream: return its tokens
+        self._check_keys(keys)
+        for store, key in zip(self.stores, keys):
+            store.refund(key, tokens)
+
+class GlobalLockHierarchy:
+    # The baseline: chained TokenBuckets with hand-rolled rollback, one big lock
+    def __init__(self, levels):
+        self.levels = [(capacity, rate, {}) for _, capacity, rate in levels]
+        self.lock = threading.Lock()
+
+    def consume(self, keys, tokens=1):
+        with self.lock:
+            buckets = []
+            for (capacity, rate, buckets_by_key), key in zip(self.levels, keys):
+                bucket = buckets_by_key.get(key)
+                if bucket is None:
+                    bucket = buckets_by_key[key] = TokenBucket(capacity, rate)
+                if not bucket.consume(tokens):
+                    for taken in buckets:
+                        taken.tokens = min(taken.capacity, taken.tokens + tokens)
+                    return False
+                buckets.append(bucket)
+            return True
+
+# ==========================================
+# 📊 BENCHMARKS
+# ==========================================
+def measure_memory_per_key(store_cls, n):
+    keys = [f"api_key_{i}" for i in range(n)] # Allocated outside the trace
+    tracemalloc.start()
+    store = store_cls(capacity=10, refill_rate=1)
+    for k in keys:
+        store.consume(k)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return used / n
+
+def measure_consume_throughput(store, num_threads, ops, keyspace):
+    per_thread = ops // num_threads
+    barrier = threading.Barrier(num_threads + 1)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        keys = [f"api_key_{rng.randrange(keyspace)}" for _ in range(per_thread)]
+        barrier.wait()
+        for k in keys:
+            store.consume(k)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(num_threads)]
+    for t in threads: t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads: t.join()
+    return per_thread * num_threads / (time.perf_counter() - start)
+
+def run_store_benchmark(n=10_000, ops=24_000):
+    # Bump n to millions to size a real deployment.
+    print(f"\n--- 🗄️ Benchmark: {n:,} API keys ---")
+    print(f"{'Store':<18} {'Bytes/key':>10}")
+    for cls in (DictOfBuckets, TokenBucketStore):
+        print(f"{cls.__name__:<18} {measure_memory_per_key(cls, n):>10.0f}")
+    print(f"{'Threads':>7} {'DictOfBuckets ops/s':>20} {'TokenBucketStore ops/s':>23}")
+    for num_threads in (1, 4, 16):
+        row = [measure_consume_throughput(cls(capacity=10, refill_rate=1), num_threads, ops, n)
+               for cls in (DictOfBuckets, TokenBucketStore)]
+        print(f"{num_threads:>7} {row[0]:>20,.0f} {row[1]:>23,.0f}")
+
+class CountingBucket(TokenBucket):
+    # Every wakeup ends in one refill check; count them
+    def __init__(self, capacity, refill_rate):
+        super().__init__(capacity, refill_rate)
+        self.checks = 0
+
+    def _refill(self):
+        self.checks += 1
+        super()._refill()
+
+async def polling_acquire(bucket, tokens=1, interval=0.001):
+    # The anti-pattern: retry consume() on a timer
+    while not bucket.consume(tokens):
+        await asyncio.sleep(interval)
+
+def run_acquire_benchmark(clients=200, rate=2_000, batch=100, batches=1_000):
+    print(f"\n--- ⏳ Benchmark: {clients} async clients, bucket refills {rate:,}/s ---")
+    print(f"{'Strategy':<18} {'Wakeups':>9} {'Wall time':>10} {'Granted/s':>10}")
+    for name, acquire in (("poll every 1ms", polling_acquire), ("acquire() FIFO", TokenBucket.acquire)):
+        bucket = CountingBucket(capacity=10, refill_rate=rate)
+
+        async def main():
+            await asyncio.gather(*(acquire(bucket) for _ in range(clients)))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} {bucket.checks:>9,} {elapsed:>9.3f}s {clients / elapsed:>10,.0f}")
+
+    requests = [1] * batch
+    print(f"\n{'Decision path':<18} {'Decisions/s':>12}")
+    bucket = TokenBucket(capacity=10 ** 9, refill_rate=1)
+    start = time.perf_counter()
+    for _ in range(batches):
+        for tokens in requests:
+            bucket.consume(tokens)
+    print(f"{'consume() x1':<18} {batch * batches / (time.perf_counter() - start):>12,.0f}")
+    start = time.perf_counter()
+    for _ in range(batches):
+        bucket.consume_many(requests)
+    print(f"{'consume_many()':<18} {batch * batches / (time.perf_counter() - start):>12,.0f}")
+
+def load_hld_rate_limiter():
+    # RateLimiter from the HLD capstone (03_hld_concepts/challenge_solution.py)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "..", "..", "03_hld_concepts", "challenge_solution.py")
+    spec = importlib.util.spec_from_file_location("hld_challenge_solution", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod.RateLimiter
+
+def run_gcra_benchmark(n=20_000, ops=100_000):
+    RateLimiter = load_hld_rate_limiter()
+    keys = [f"api_key_{i}" for i in range(n)]
+    print(f"\n--- 📐 Benchmark: GCRA vs token buckets ({n:,} keys, {ops:,} ops) ---")
+    print(f"{'Limiter':<24} {'Bytes/key':>10} {'Ops/sec':>12}")
+
+    candidates = {
+        "TokenBucket (06)": (lambda: TokenBucket(10, 1), lambda b, k: b.consume()),
+        "RateLimiter (03 HLD)": (lambda: RateLimiter(1, 10), lambda b, k: b.allow()),
+    }
+    for name, (make, call) in candidates.items():
+        tracemalloc.start()
+        per_key = {k: make() for k in keys} # One object per key
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        bucket = per_key[keys[0]]
+        start = time.perf_counter()
+        for _ in range(ops):
+            call(bucket, keys[0])
+        print(f"{name:<24} {used / n:>10.0f} {ops / (time.perf_counter() - start):>12,.0f}")
+        del per_key
+
+    tracemalloc.start()
+    gcra = GCRALimiter(rate=1, burst=10)
+    for k in keys:
+        gcra.consume(k)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(ops):
+        gcra.consume(keys[0])
+    print(f"{'GCRALimiter':<24} {used / n:>10.0f} {ops / (time.perf_counter() - start):>12,.0f}")
+
+LEVELS = [("user", 20, 10), ("tenant", 200, 100), ("global", 5_000, 2_500)]
+
+def run_hierarchy_benchmark(ops=24_000, users=1_000, tenants=20):
+    print(f"\n--- 🏛️ Benchmark: 3-level limits, {users:,} users in {tenants} tenants ---")
+    print(f"{'Threads':>7} {'GlobalLock ops/s':>17} {'Hierarchical ops/s':>19}")
+    for num_threads in (1, 4, 16):
+        row = []
+        for limiter in (GlobalLockHierarchy(LEVELS), HierarchicalLimiter(LEVELS)):
+            per_thread = ops // num_threads
+            barrier = threading.Barrier(num_threads + 1)
+
+            def worker(seed):
+                rng = random.Random(seed)
+                requests = []
+                for _ in range(per_thread):
+                    user = rng.randrange(users)
+                    requests.append((f"user_{user}", f"tenant_{user % tenants}", "global"))
+                barrier.wait()
+                for keys in requests:
+                    limiter.consume(keys)
+
+            threads = [threading.Thread(target=worker, args=(t,)) for t in range(num_threads)]
+            for t in threads: t.start()
+            barrier.wait()
+            start = time.perf_counter()
+            for t in threads: t.join()
+            row.append(per_thread * num_threads / (time.perf_counter() - start))
+        print(f"{num_threads:>7} {row[0]:>17,.0f} {row[1]:>19,.0f}")
+
 def run_simulation():
     print("--- 🪣 Token Bucket Demo ---")
     # Cap 5, Refill 1 per sec
@@ -61,5 +514,68 @@ def run_simulation():
     print("\n🏆 Insight: Token Bucket allows bursts (unlike Leaky Bucket).")
     print("   🏢 Real World: **Stripe** API, **Uber** driver matching, **AWS** API Throttling.")
 
+def run_async_simulation():
+    print("\n--- ⏳ Async acquire() Demo ---")
+    bucket = TokenBucket(capacity=5, refill_rate=50)
+    bucket.consume(5) # Drain it
+
+    async def client(name, tokens):
+        start = time.perf_counter()
+        await bucket.acquire(tokens)
+        print(f"   ✅ {name} got {tokens} token(s) after {(time.perf_counter() - start) * 1e3:.0f}ms")
+
+    async def main():
+        # Big request first: FIFO means the small ones can't cut in line
+        await asyncio.gather(client("Big", 5), client("Small-1", 1), client("Small-2", 1))
+
+    asyncio.run(main())
+    fresh = TokenBucket(capacity=5, refill_rate=1)
+    print(f"Batch [2, 2, 2] on a full bucket of 5: {fresh.consume_many([2, 2, 2])}")
+    run_acquire_benchmark()
+    print("\n🏆 Insight: A token bucket knows its own future. Sleep for the deficit, don't poll.")
+    print("   🏢 Real World: **Guava RateLimiter.acquire()**, **aiolimiter** (asyncio).")
+
+def run_gcra_simulation():
+    print("\n--- 📐 GCRA Demo (rate 1/s, burst 3) ---")
+    now = [0.0]
+    gcra = GCRALimiter(rate=1, burst=3, clock=lambda: now[0])
+    for i in range(4):
+        allowed, retry_after = gcra.check("user_1")
+        print(f"   Req {i+1}: {'✅ Allowed' if allowed else f'❌ 429, Retry-After {retry_after:.1f}s'}")
+    now[0] = 1.0
+    print(f"   t=1s: {'✅ Allowed' if gcra.consume('user_1') else '❌ Denied'} (one interval passed)")
+    run_gcra_benchmark()
+    print("\n🏆 Insight: A token bucket is a schedule in disguise. Store WHEN, not HOW MANY.")
+    print("   🏢 Real World: **redis-cell** (CL.THROTTLE), Go's **throttled**. Born in ATM (Asynchronous Transfer Mode) switches.")
+
+def run_hierarchy_simulation():
+    print("\n--- 🏛️ Hierarchical Limits Demo ---")
+    limiter = HierarchicalLimiter([("user", 3, 0.001), ("tenant", 4, 0.001), ("global", 100, 0.001)])
+    for user in ["alice", "alice", "alice", "alice", "bob", "bob"]:
+        level = limiter.denied_by((user, "acme", "global"))
+        print(f"   {user:<5}: {'✅ Allowed' if level is None else f'❌ Denied by {level} limit'}")
+    print("   (bob's 2nd request: tenant said no -> checked before any debit, his user token is untouched)")
+    run_hierarchy_benchmark()
+    print("\n🏆 Insight: Nested quotas = lock each level's stripe in a fixed order, check all, then debit all.")
+    print("   Under the GIL one big lock is cheaper per call (1 acquire vs 3); striping pays off on")
+    print("   free-threaded Python, or when each level lives on a different Redis shard.")
+    print("   🏢 Real World: **AWS API Gateway** (account / stage / method), **Stripe** (per-key + global load shedding).")
+
+def run_store_simulation():
+    print("\n--- 🗄️ Keyed Store Demo ---")
+    now = [0.0]
+    store = TokenBucketStore(capacity=2, refill_rate=1, clock=lambda: now[0])
+    print(f"key_A x3: {[store.consume('key_A') for _ in range(3)]} (burst of 2)")
+    print(f"key_B x1: {store.consume('key_B')} (own bucket)")
+    now[0] = 5.0 # Both keys idle long enough to be full again
+    print(f"Evicted {store.evict_idle()} idle keys -> {len(store)} tracked")
+    run_store_benchmark()
+    print("\n🏆 Insight: State per key is just (tokens, timestamp). Store it flat, refill lazily, forget idle keys.")
+    print("   🏢 Real World: **Envoy** local rate limit, **Redis** + Lua token buckets (key TTL = idle eviction).")
+
 if __name__ == "__main__":
     run_simulation()
+    run_async_simulation()
+    run_store_simulation()
+    run_gcra_simulation()
+    run_hierarchy_simulation()
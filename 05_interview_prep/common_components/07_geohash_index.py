@@ -0,0 +1,276 @@
+# 07_geohash_index.py
+import importlib.util
+import math
+import os
+import random
+import time
+
+# ==========================================
+# 🔲 GEOHASH GRID INDEX (Fixed Cells + Hash Map)
+# ==========================================
+# SCENARIO: Uber dispatch asks "who is in MY cell and the cells around me?"
+# QUADTREE: Adapts to density, but every insert/query walks the tree from the root.
+# GEOHASH: Cut the world into fixed cells, name each cell with a short string
+# ("9q8yy"), keep {cell -> set of driver ids}. Insert, move and lookup are
+# plain dict operations. O(1), no tree at all.
+#
+# Geohash = interleave the bits of lon and lat, then base32 encode.
+# 5 bits per char: precision 6 ~ 1.2km x 0.6km, precision 7 ~ 150m x 150m.
+# Coordinates here are treated as a flat plane (x = lon, y = lat), like the QuadTree lesson.
+
+# Index keys are the INTEGER geohash (like Redis' 52-bit score); strings are just for display.
+# Precision up to 12 chars (60 bits).
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+DECODE = {c: i for i, c in enumerate(BASE32)}
+
+def _bits(precision):
+    # Longitude gets the extra bit when the total is odd
+    bits = precision * 5
+    return (bits + 1) // 2, bits // 2
+
+def _spread(v):
+    # abcd -> 0a0b0c0d (magic-number bit interleave, no Python loop over bits)
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    return (v | (v << 1)) & 0x5555555555555555
+
+def _squash(v):
+    # Inverse of _spread: keep every other bit
+    v &= 0x5555555555555555
+    v = (v | (v >> 1)) & 0x3333333333333333
+    v = (v | (v >> 2)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v >> 4)) & 0x00FF00FF00FF00FF
+    v = (v | (v >> 8)) & 0x0000FFFF0000FFFF
+    return (v | (v >> 16)) & 0xFFFFFFFF
+
+def cell_xy(x, y, precision):
+    # (lon, lat) -> integer cell column/row at this precision
+    lon_bits, lat_bits = _bits(precision)
+    xi = int((x + 180.0) / 360.0 * (1 << lon_bits))
+    yi = int((y + 90.0) / 180.0 * (1 << lat_bits))
+    return min(max(xi, 0), (1 << lon_bits) - 1), min(max(yi, 0), (1 << lat_bits) - 1)
+
+def code_of(xi, yi, precision):
+    # Interleave lon, lat, lon, ... starting at the most significant bit
+    if precision % 2 == 0:
+        return (_spread(xi) << 1) | _spread(yi)
+    return _spread(xi) | (_spread(yi) << 1)
+
+def split_code(code, precision):
+    if precision % 2 == 0:
+        return _squash(code >> 1), _squash(code)
+    return _squash(code), _squash(code >> 1)
+
+def to_string(code, precision):
+    chars = []
+    for _ in range(precision):
+        chars.append(BASE32[code & 31])
+        code >>= 5
+    return "".join(reversed(chars))
+
+def from_string(geohash):
+    code = 0
+    for c in geohash:
+        code = (code << 5) | DECODE[c]
+    return code
+
+def encode(x, y, precision=6):
+    return to_string(code_of(*cell_xy(x, y, precision), precision), precision)
+
+def neighbours(geohash):
+    # The 8 surrounding cells. Longitude wraps around, latitude stops at the poles.
+    precision = len(geohash)
+    lon_bits, lat_bits = _bits(precision)
+    xi, yi = split_code(from_string(geohash), precision)
+    result = []
+    for dy in (-1, 0, 1):
+        ny = yi + dy
+        if not 0 <= ny < (1 << lat_bits):
+            continue
+        for dx in (-1, 0, 1):
+            if dx or dy:
+                result.append(to_string(code_of((xi + dx) % (1 << lon_bits), ny, precision), precision))
+    return result
+
+class GeohashIndex:
+    def __init__(self, precision=6):
+        self.precision = precision
+        self.cols, self.rows = (1 << b for b in _bits(precision))
+        self.cells = {}     # integer geohash -> set of driver ids
+        self.drivers = {}   # driver id -> [x, y, integer geohash]
+
+    def _code(self, x, y):
+        return code_of(*cell_xy(x, y, self.precision), self.precision)
+
+    def insert(self, driver):
+        cell = self._code(driver.x, driver.y)
+        self.cells.setdefault(cell, set()).add(driver.id)
+        self.drivers[driver.id] = [driver.x, driver.y, cell]
+
+    def remove(self, driver_id):
+        entry = self.drivers.pop(driver_id, None)
+        if entry is None:
+            return False
+        members = self.cells[entry[2]]
+        members.discard(driver_id)
+        if not members:
+            del self.cells[entry[2]] # Don't keep empty cells around
+        return True
+
+    def update(self, driver_id, x, y):
+        # GPS ping. Same cell (the common case): overwrite x/y. Else move between two sets.
+        entry = self.drivers[driver_id]
+        cell = self._code(x, y)
+        if cell != entry[2]:
+            members = self.cells[entry[2]]
+            members.discard(driver_id)
+            if not members:
+                del self.cells[entry[2]]
+            self.cells.setdefault(cell, set()).add(driver_id)
+            entry[2] = cell
+        entry[0], entry[1] = x, y
+
+    def nearby(self, x, y):
+        # Dispatch's favourite question: ids in my cell + the 8 around it
+        xi, yi = cell_xy(x, y, self.precision)
+        found = []
+        for ny in (yi - 1, yi, yi + 1):
+            if not 0 <= ny < self.rows:
+                continue
+            for nx in (xi - 1, xi, xi + 1):
+                found.extend(self.cells.get(code_of(nx % self.cols, ny, self.precision), ()))
+        return found
+
+    def query_radius(self, x, y, r):
+        # Visit every cell overlapping the circle's bounding box, then exact distance check
+        _, y0 = cell_xy(x, y - r, self.precision)
+        _, y1 = cell_xy(x, y + r, self.precision)
+        # Columns wrap around the antimeridian like nearby(); rows stop at the poles
+        x0 = math.floor((x - r + 180.0) / 360.0 * self.cols)
+        x1 = math.floor((x + r + 180.0) / 360.0 * self.cols)
+        x1 = min(x1, x0 + self.cols - 1) # Wider than the world: each column once
+        r2 = r * r
+        # Interleave each column/row once, then a cell's code is just an OR
+        even = self.precision % 2 == 0
+        cols = [_spread(xi % self.cols) << even for xi in range(x0, x1 + 1)]
+        rows = [_spread(yi) << (not even) for yi in range(y0, y1 + 1)]
+        found = []
+        for row in rows:
+            for col in cols:
+                for driver_id in self.cells.get(row | col, ()):
+                    px, py, _ = self.drivers[driver_id]
+                    dx = px - x
+                    if dx > 180.0: # 179.9 and -179.9 are 0.2 apart, not 359.8
+                        dx -= 360.0
+                    elif dx < -180.0:
+                        dx += 360.0
+                    if dx ** 2 + (py - y) ** 2 <= r2:
+                        found.append(driver_id)
+        return found
+
+    def __len__(self):
+        return len(self.drivers)
+
+# ==========================================
+# 📊 BENCHMARK vs QUADTREE
+# ==========================================
+def load_geospatial_module():
+    # QuadTree + Driver from the sibling lesson (03_geospatial_index.py)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "03_geospatial_index.py")
+    spec = importlib.util.spec_from_file_location("geospatial_index", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+# San Francisco-ish bounding box (lon, lat, width, height)
+CITY = (-122.52, 37.70, 0.16, 0.12)
+
+def city_points(n, clustered, rng):
+    cx, cy, w, h = CITY
+    if not clustered:
+        return [(rng.uniform(cx, cx + w), rng.uniform(cy, cy + h)) for _ in range(n)]
+    # A few hot spots (downtown, stadium, airport road...) holding most of the drivers
+    hubs = [(rng.uniform(cx, cx + w), rng.uniform(cy, cy + h)) for _ in range(6)]
+    points = []
+    for _ in range(n):
+        hx, hy = rng.choice(hubs)
+        points.append((min(max(rng.gauss(hx, 0.006), cx), cx + w - 1e-9),
+                       min(max(rng.gauss(hy, 0.006), cy), cy + h - 1e-9)))
+    return points
+
+def clamp_to_city(x, y):
+    cx, cy, w, h = CITY
+    return min(max(x, cx), cx + w - 1e-9), min(max(y, cy), cy + h - 1e-9)
+
+def per_op_us(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(*item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+def run_benchmark(n=20_000, queries=200, radius=0.01, precision=6):
+    # Bump n to 1_000_000 for a city-at-rush-hour run (QuadTree build takes a while).
+    geo = load_geospatial_module()
+    rng = random.Random(17)
+    print(f"\n--- 🏁 Benchmark: {n:,} drivers, radius {radius} deg (~1km), geohash precision {precision} ---")
+    print(f"{'Distribution':<12} {'Index':<10} {'Insert':>10} {'Move':>10} {'Radius':>12} {'Found':>7}")
+    for clustered in (False, True):
+        points = city_points(n, clustered, rng)
+        moves = [clamp_to_city(x + rng.uniform(-5e-4, 5e-4), y + rng.uniform(-5e-4, 5e-4)) for x, y in points]
+        riders = rng.sample(points, queries)
+        drivers = [geo.Driver(i, x, y) for i, (x, y) in enumerate(points)]
+
+        qt = geo.QuadTree(CITY)
+        gh = GeohashIndex(precision)
+
+        def qt_radius(x, y):
+            box = qt.query((x - radius, y - radius, 2 * radius, 2 * radius))
+            return [d for d in box if (d.x - x) ** 2 + (d.y - y) ** 2 <= radius * radius]
+
+        results = {}
+        for name, insert, move, radius_query in (
+            ("QuadTree", lambda d: qt.insert(d), lambda i, x, y: qt.update(drivers[i], x, y), qt_radius),
+            ("Geohash", lambda d: gh.insert(d), lambda i, x, y: gh.update(i, x, y),
+             lambda x, y: gh.query_radius(x, y, radius)),
+        ):
+            t_insert = per_op_us(insert, [(d,) for d in drivers])
+            t_move = per_op_us(move, [(i, x, y) for i, (x, y) in enumerate(moves)])
+            start = time.perf_counter()
+            found = sum(len(radius_query(x, y)) for x, y in riders)
+            t_radius = (time.perf_counter() - start) / queries * 1e6
+            results[name] = found
+            label = "clustered" if clustered else "uniform"
+            print(f"{label:<12} {name:<10} {t_insert:>8.1f}us {t_move:>8.1f}us {t_radius:>10.1f}us {found // queries:>7}")
+        assert results["QuadTree"] == results["Geohash"] # Same answers, different cost
+
+if __name__ == "__main__":
+    print("--- 🔲 Geohash Grid Simulation ---")
+    rng = random.Random(7)
+    index = GeohashIndex(precision=6)
+
+    class Ping:
+        def __init__(self, id, x, y):
+            self.id, self.x, self.y = id, x, y
+
+    cx, cy, w, h = CITY
+    for i in range(200):
+        index.insert(Ping(i, rng.uniform(cx, cx + w), rng.uniform(cy, cy + h)))
+
+    rider = (-122.42, 37.77)
+    cell = encode(*rider, precision=6)
+    print(f"📍 Rider at {rider} is in cell '{cell}'")
+    print(f"   Neighbours: {', '.join(neighbours(cell))}")
+    print(f"✅ {len(index.nearby(*rider))} drivers in the 3x3 block, "
+          f"{len(index.query_radius(*rider, 0.01))} within ~1km")
+
+    # Driver 0 drives across town: one set removal + one set add
+    index.update(0, *rider)
+    print(f"🚕 Driver 0 moved into the rider's cell: {0 in index.cells[from_string(cell)]}")
+
+    run_benchmark()
+    print("\n🏆 Insight: Fixed cells turn insert/move/lookup into dict ops with no tree to walk or rebalance.")
+    print("   In Python the constant factors are close. Pick the precision so a radius spans only a few cells.")
+    print("   🏢 Real World: **Redis** GEOADD/GEOSEARCH store 52-bit geohash scores. **Elasticsearch** geohash_grid aggregations.")
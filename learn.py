@@ -204,6 +204,7 @@ COURSE = [
                     {"file": "04_lru_cache.py", "title": "LRU Cache (Dict + DoublyLL)"},
                     {"file": "05_trie_autocomplete.py", "title": "Trie (Prefix Tree/Typeahead)"},
                     {"file": "06_token_bucket.py", "title": "Token Bucket (Rate Limiter Algo)"},
+                    {"file": "07_geohash_index.py", "title": "Geohash Grid (Cells vs QuadTree)"},
                 ]
             },
             {"file": "Q1_RateLimiter/optimal.py", "title": "Q1: Rate Limiter (Redis)"},
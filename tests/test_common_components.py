@@ -1,7 +1,12 @@
 
+import asyncio
 import pytest
+import queue
+import random
 import sys
 import os
+import threading
+from datetime import datetime, timezone
 
 # Add root to path so we can import modules
 sys.path.append(os.getcwd())
@@ -24,6 +29,10 @@ def load_module(name, path):
 lru_mod = load_module("lru_cache", "05_interview_prep/common_components/04_lru_cache.py")
 trie_mod = load_module("trie", "05_interview_prep/common_components/05_trie_autocomplete.py")
 token_mod = load_module("token_bucket", "05_interview_prep/common_components/06_token_bucket.py")
+geo_mod = load_module("geospatial", "05_interview_prep/common_components/03_geospatial_index.py")
+geohash_mod = load_module("geohash_index", "05_interview_prep/common_components/07_geohash_index.py")
+scheduler_mod = load_module("distributed_scheduler", "05_interview_prep/common_components/02_distributed_scheduler.py")
+notify_mod = load_module("notification_service", "05_interview_prep/common_components/01_notification_service.py")
 
 class TestLRUCache:
     def test_lru_eviction(self):
@@ -45,6 +54,177 @@ class TestLRUCache:
         assert cache.get("A") == 10
         assert len(cache.cache) == 1
 
+    def test_compact_matches_lru_semantics(self):
+        cache = lru_mod.CompactLRUCache(2, verbose=False)
+        cache.put("A", 1)
+        cache.put("B", 2)
+        assert cache.get("A") == 1
+        cache.put("C", 3) # Evicts B
+        assert cache.get("B") == -1
+        assert cache.get("A") == 1
+        cache.put("A", 10) # Update
+        assert cache.get("A") == 10
+        assert len(cache.cache) == 2
+
+    def test_compact_recycles_slots(self):
+        cache = lru_mod.CompactLRUCache(3, verbose=False)
+        for i in range(100):
+            cache.put(i, i)
+        assert cache.high_water == 3 # Never grew past capacity
+        assert [cache.get(i) for i in (97, 98, 99)] == [97, 98, 99]
+
+    def test_compact_zero_capacity_stores_nothing(self):
+        cache = lru_mod.CompactLRUCache(0, verbose=False)
+        cache.put("A", 1)
+        assert cache.get("A") == -1 and cache.cache == {}
+
+    def test_weighted_eviction(self):
+        cache = lru_mod.LRUCache(100, verbose=False, weigher=len, max_weight=10)
+        cache.put("A", "aaaa")
+        cache.put("B", "bbbb")
+        cache.put("C", "cccc") # 12 > 10 -> evict A
+        assert cache.get("A") == -1
+        assert cache.total_weight == 8
+        cache.put("HUGE", "x" * 50) # Never fits -> rejected, nothing flushed
+        assert cache.get("HUGE") == -1
+        assert cache.get("B") == "bbbb"
+
+    def test_ttl_lazy_expiry_and_sweep(self):
+        now = [0.0]
+        cache = lru_mod.LRUCache(100, verbose=False, ttl=10, clock=lambda: now[0])
+        cache.put("short", 1, ttl=1)
+        cache.put("long", 2)
+        now[0] = 1.5
+        assert cache.get("short") == -1 # Lazily expired
+        assert cache.get("long") == 2
+        for i in range(5):
+            cache.put(i, i, ttl=2)
+        now[0] = 20.0
+        assert cache.sweep() == 6 # "long" + the 5 short-lived keys
+        assert len(cache.cache) == 0
+        assert cache.total_weight == 0
+
+    def test_count_min_sketch_ages(self):
+        sketch = lru_mod.CountMinSketch(64, sample_size=1000)
+        for _ in range(10):
+            sketch.increment("hot")
+        assert sketch.estimate("hot") >= 10
+        assert sketch.estimate("never-seen") <= sketch.estimate("hot")
+        for i in range(1000): # Trigger aging
+            sketch.increment(("noise", i))
+        assert sketch.estimate("hot") < 10
+
+    def test_tinylfu_resists_scans(self):
+        cache = lru_mod.TinyLFUCache(capacity=100)
+        hot = [f"hot_{i}" for i in range(50)]
+        scan_key = 0
+        for _ in range(20):
+            for k in hot * 3:
+                if cache.get(k) == -1:
+                    cache.put(k, k)
+            for _ in range(500): # One-hit-wonder batch scan
+                if cache.get(("scan", scan_key)) == -1:
+                    cache.put(("scan", scan_key), scan_key)
+                scan_key += 1
+        assert len(cache) <= 100
+        survivors = sum(1 for k in hot if k in cache.main.cache)
+        assert survivors >= 45 # Plain LRU would keep 0
+
+    def test_tinylfu_counts_writes_and_respects_capacity(self):
+        cache = lru_mod.TinyLFUCache(capacity=100)
+        for i in range(100):
+            cache.put(i, i)
+        for _ in range(3): # Write-only traffic: never read, but written often
+            for i in range(1000, 1010):
+                cache.put(i, i)
+        assert sum(1 for i in range(1000, 1010) if i in cache.main.cache) >= 8
+        assert len(cache) == 100
+        with pytest.raises(ValueError):
+            lru_mod.TinyLFUCache(1)
+        tiny = lru_mod.TinyLFUCache(2)
+        for i in range(10):
+            tiny.put(i, i)
+        assert len(tiny) == 2
+
+    def test_single_flight_threads(self):
+        sf = lru_mod.SingleFlightCache(lru_mod.LRUCache(10, verbose=False))
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def loader(key):
+            calls.append(key)
+            started.set()
+            release.wait(timeout=5) # Hold the load open while others pile up
+            return key.upper()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(sf.get_or_load("k", loader)))
+                   for _ in range(50)]
+        for t in threads: t.start()
+        assert started.wait(timeout=5) # The leader is inside the loader
+        release.set()
+        for t in threads: t.join()
+        assert calls == ["k"]
+        assert results == ["K"] * 50
+        assert sf.in_flight == {}
+
+    def test_single_flight_errors_are_not_cached(self):
+        sf = lru_mod.SingleFlightCache(lru_mod.LRUCache(10, verbose=False))
+
+        def broken(key):
+            raise ConnectionError("db down")
+
+        with pytest.raises(ConnectionError):
+            sf.get_or_load("k", broken)
+        assert sf.get_or_load("k", lambda key: 7) == 7
+
+    def test_single_flight_cleans_up_when_put_raises(self):
+        sf = lru_mod.SingleFlightCache(lru_mod.LRUCache(10, verbose=False, weigher=len, max_weight=100))
+        with pytest.raises(TypeError):
+            sf.get_or_load("k", lambda key: 7) # len(7) fails inside cache.put
+        assert sf.in_flight == {}
+        assert sf.get_or_load("k", lambda key: "seven") == "seven"
+
+    def test_single_flight_asyncio(self):
+        sf = lru_mod.AsyncSingleFlightCache(lru_mod.LRUCache(10, verbose=False))
+        calls = []
+
+        async def loader(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return 42
+
+        async def main():
+            return await asyncio.gather(*(sf.get_or_load("k", loader) for _ in range(100)))
+
+        assert asyncio.run(main()) == [42] * 100
+        assert calls == ["k"]
+
+    def test_sharded_capacity_and_stats(self):
+        cache = lru_mod.ShardedLRUCache(capacity=10, num_shards=4)
+        assert sum(s.capacity for s in cache.shards) == 10
+        for i in range(100):
+            cache.put(i, i)
+        assert len(cache) <= 10
+        assert cache.get(99) == 99
+        assert cache.get("missing") == -1
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+
+    def test_sharded_concurrent_access(self):
+        cache = lru_mod.ShardedLRUCache(capacity=50, num_shards=8)
+
+        def worker(offset):
+            for i in range(2000):
+                cache.put((offset, i % 100), i)
+                cache.get((offset, i % 100))
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        assert len(cache) <= 50
+        assert cache.stats()["hits"] + cache.stats()["misses"] == 8 * 2000
+
 class TestTrie:
     def test_insert_search(self):
         trie = trie_mod.Trie()
@@ -58,6 +238,74 @@ class TestTrie:
         res2 = trie.search_prefix("zoo")
         assert res2 == []
 
+    def test_ranked_by_frequency(self):
+        trie = trie_mod.Trie(k=2)
+        for w in ["car", "cat", "cart", "cake"]:
+            trie.insert(w)
+        trie.insert("cake", count=5)
+        trie.insert("cart", count=2)
+        assert trie.search_prefix("ca") == ["cake", "cart"]
+        assert trie.search_prefix("car") == ["cart", "car"]
+        trie.insert("car", count=10) # Bump overtakes
+        assert trie.search_prefix("c") == ["car", "cake"]
+        assert trie.search_prefix("cak") == ["cake"]
+
+    def test_fuzzy_prefix_search(self):
+        trie = trie_mod.Trie()
+        trie.insert("python", count=5)
+        trie.insert("pytorch", count=9)
+        trie.insert("java", count=20)
+        assert trie.search_prefix("pyht") == []
+        assert trie.search_fuzzy("pyt", max_dist=0) == ["pytorch", "python"]
+        assert trie.search_fuzzy("pyhton", max_dist=1) == [] # Transposition = 2 edits
+        # 2 edits: "pyhton" -> "python", but also -> "pyto" (prefix of pytorch)
+        assert set(trie.search_fuzzy("pyhton", max_dist=2)) == {"python", "pytorch"}
+        assert trie.search_fuzzy("pythn", max_dist=1)[0] == "python"
+        # Exact matches beat more popular fuzzy ones
+        trie.insert("pythia", count=1)
+        assert trie.search_fuzzy("pythi", max_dist=1)[0] == "pythia"
+
+    def test_radix_splits_edges(self):
+        trie = trie_mod.RadixTrie()
+        trie.insert("romane")
+        trie.insert("romanus")
+        trie.insert("rom")
+        node = trie.root.children["r"]
+        assert node.label == "rom" and node.is_end_of_word
+        assert sorted(c.label for c in node.children["a"].children.values()) == ["e", "us"]
+        assert sorted(trie.search_prefix("roma")) == ["romane", "romanus"]
+        assert trie.search_prefix("romb") == []
+
+    def test_radix_matches_trie(self):
+        words = ["car", "cat", "cart", "cake", "carbon", "hello", "help", "he", "a"]
+        trie, radix = trie_mod.Trie(), trie_mod.RadixTrie()
+        for w in words:
+            trie.insert(w)
+            radix.insert(w)
+        trie.insert("help", count=3)
+        radix.insert("help", count=3)
+        for prefix in ["", "c", "ca", "car", "carb", "h", "hel", "x", "helpx"]:
+            assert radix.search_prefix(prefix) == trie.search_prefix(prefix)
+
+    def test_mapped_trie_matches_trie(self, tmp_path):
+        items = [("app", 3), ("apple", 9), ("apply", 4), ("banana", 1), ("band", 7), ("bandana", 2), ("café", 5)]
+        trie = trie_mod.Trie(k=2)
+        for word, count in items:
+            trie.insert(word, count)
+        path = str(tmp_path / "words.trie")
+        trie_mod.build_trie_file(path, items, k=2)
+        with trie_mod.MappedTrie(path) as mapped:
+            for prefix in ["", "a", "app", "appl", "b", "ban", "band", "caf", "café", "x", "applez"]:
+                assert mapped.search_prefix(prefix) == trie.search_prefix(prefix)
+
+    def test_bulk_build_rejects_unsorted(self, tmp_path):
+        with pytest.raises(ValueError):
+            trie_mod.build_trie_file(str(tmp_path / "bad.trie"), [("b", 1), ("a", 1)])
+        for items, k in (([("a", 1)], 256), ([("a", 1), ("b", 2 ** 32)], 5)):
+            with pytest.raises(ValueError):
+                trie_mod.build_trie_file(str(tmp_path / "bad.trie"), items, k=k)
+        assert list(tmp_path.iterdir()) == [] # No half-written file left behind
+
 class TestTokenBucket:
     def test_bursts(self):
         bucket = token_mod.TokenBucket(capacity=5, refill_rate=100) # Fast refill
@@ -69,3 +317,451 @@ class TestTokenBucket:
         bucket = token_mod.TokenBucket(capacity=1, refill_rate=0.1)
         assert bucket.consume(1) == True
         assert bucket.consume(1) == False # Empty
+
+    def test_consume_many(self):
+        bucket = token_mod.TokenBucket(capacity=5, refill_rate=0.001)
+        assert bucket.consume_many([2, 2, 2, 1]) == [True, True, False, True]
+
+    def test_async_acquire_is_fifo(self):
+        bucket = token_mod.TokenBucket(capacity=4, refill_rate=200)
+        bucket.consume(4)
+        order = []
+
+        async def client(name, tokens):
+            await bucket.acquire(tokens)
+            order.append(name)
+
+        async def main():
+            await asyncio.gather(client("big", 4), client("small-1", 1), client("small-2", 1))
+
+        asyncio.run(main())
+        assert order == ["big", "small-1", "small-2"]
+        assert not bucket.waiters
+        with pytest.raises(ValueError):
+            asyncio.run(bucket.acquire(5))
+
+    def test_async_acquire_cancellation_passes_turn(self):
+        bucket = token_mod.TokenBucket(capacity=1, refill_rate=100)
+        bucket.consume(1)
+
+        async def main():
+            first = asyncio.ensure_future(bucket.acquire(1))
+            second = asyncio.ensure_future(bucket.acquire(1))
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.wait_for(second, timeout=1)
+
+        asyncio.run(main())
+        assert not bucket.waiters
+
+    def test_keyed_store_lazy_refill_and_eviction(self):
+        now = [0.0]
+        store = token_mod.TokenBucketStore(capacity=2, refill_rate=1, stripes=1, clock=lambda: now[0])
+        assert [store.consume("a") for _ in range(3)] == [True, True, False]
+        assert store.consume("b") == True # Independent bucket
+        now[0] = 1.0
+        assert store.consume("a") == True # 1 token refilled lazily
+        assert store.consume("a") == False
+        now[0] = 2.5 # "b" idle 2.5s >= capacity / rate
+        assert store.evict_idle() == 1
+        assert len(store) == 1
+        assert store.consume("c") == True # Reuses b's freed slot
+        assert sum(len(s.keys) for s in store.stripes) == 2
+
+    def test_gcra_matches_bucket_limits(self):
+        now = [100.0]
+        gcra = token_mod.GCRALimiter(rate=2, burst=3, clock=lambda: now[0])
+        assert [gcra.consume("k") for _ in range(4)] == [True, True, True, False]
+        allowed, retry_after = gcra.check("k")
+        assert not allowed and retry_after == pytest.approx(0.5)
+        assert gcra.consume("other") # Independent key
+        now[0] += 0.5
+        assert gcra.consume("k") and not gcra.consume("k")
+        with pytest.raises(ValueError): # Bigger than the burst: no Retry-After could ever help
+            gcra.check("k", tokens=4)
+        now[0] += 10
+        assert gcra.evict_idle() == 2
+        assert gcra.tat == {}
+
+    def test_hierarchical_all_or_nothing(self):
+        limiter = token_mod.HierarchicalLimiter(
+            [("user", 2, 0.001), ("tenant", 3, 0.001), ("global", 100, 0.001)], stripes=4)
+        assert limiter.consume(("alice", "acme", "g"))
+        assert limiter.consume(("alice", "acme", "g"))
+        assert limiter.denied_by(("alice", "acme", "g")) == "user"
+        assert limiter.consume(("bob", "acme", "g"))
+        assert limiter.denied_by(("bob", "acme", "g")) == "tenant" # Tenant has 3
+        # Denied before any debit: bob's user token and global only paid for admitted requests
+        user_store, _, global_store = limiter.stores
+        stripe = user_store.stripes[hash("bob") % 4]
+        assert stripe.tokens[stripe.slots["bob"]] == pytest.approx(1, abs=0.01)
+        stripe = global_store.stripes[hash("g") % 4]
+        assert stripe.tokens[stripe.slots["g"]] == pytest.approx(97, abs=0.01)
+        # Cancel an admitted request -> every level gets its token back
+        limiter.refund(("bob", "acme", "g"))
+        assert limiter.consume(("carol", "acme", "g"))
+        with pytest.raises(ValueError):
+            limiter.consume(("dave", "acme")) # Missing the global key
+
+class TestQuadTree:
+    def make_tree(self, n=500, seed=0):
+        rng = random.Random(seed)
+        qt = geo_mod.QuadTree((0, 0, 100, 100))
+        drivers = [geo_mod.Driver(i, rng.uniform(0, 100), rng.uniform(0, 100)) for i in range(n)]
+        for d in drivers:
+            qt.insert(d)
+        return qt, drivers
+
+    def test_nearest_matches_brute_force(self):
+        qt, drivers = self.make_tree()
+        for x, y in [(50, 50), (0, 0), (99.9, 0.1), (150, 150)]:
+            expected = sorted(drivers, key=lambda d: (d.x - x) ** 2 + (d.y - y) ** 2)[:5]
+            assert [d.id for d in qt.nearest(x, y, k=5)] == [d.id for d in expected]
+
+    def test_nearest_with_fewer_drivers_than_k(self):
+        qt, _ = self.make_tree(n=3)
+        assert len(qt.nearest(10, 10, k=5)) == 3
+        assert qt.nearest(10, 10, k=0) == []
+
+    def assert_index_consistent(self, qt, drivers):
+        assert len(qt.index) == len(drivers)
+        for d in drivers:
+            node = qt.index[d.id]
+            assert d in node.drivers
+            assert node._contains(d.x, d.y)
+
+    def test_update_and_remove_in_place(self):
+        rng = random.Random(1)
+        qt, drivers = self.make_tree(n=300)
+        for _ in range(5):
+            for d in drivers:
+                qt.update(d, rng.uniform(0, 99.99), rng.uniform(0, 99.99))
+        self.assert_index_consistent(qt, drivers)
+        assert len(qt.query((0, 0, 100, 100))) == 300
+
+        for d in drivers[:250]:
+            assert qt.remove(d)
+        assert not qt.remove(drivers[0]) # Already gone
+        self.assert_index_consistent(qt, drivers[250:])
+        assert sorted(d.id for d in qt.query((0, 0, 100, 100))) == [d.id for d in drivers[250:]]
+
+    def test_empty_children_merge_back(self):
+        qt, drivers = self.make_tree(n=50)
+        assert qt.divided
+        for d in drivers[:47]:
+            qt.remove(d)
+        assert not qt.divided # 3 drivers fit in the root again
+        assert sorted(d.id for d in qt.drivers) == [47, 48, 49]
+
+    def test_iter_query_matches_query_and_stops_at_limit(self):
+        qt, _ = self.make_tree(n=1000)
+        for box in [(0, 0, 100, 100), (10, 20, 30, 5), (200, 200, 10, 10)]:
+            assert list(qt.iter_query(box)) == qt.query(box)
+        assert list(qt.iter_query((0, 0, 100, 100), limit=7)) == qt.query((0, 0, 100, 100))[:7]
+        assert list(qt.iter_query((0, 0, 100, 100), limit=0)) == []
+
+    def test_batch_dispatch_beats_first_come_first_served(self):
+        def line_tree():
+            qt = geo_mod.QuadTree((-10, -10, 20, 20))
+            for i, x in enumerate((1.0, -1.5)):
+                qt.insert(geo_mod.Driver(i, x, 0.0))
+            return qt
+        riders = [(0.0, 0.0), (1.8, 0.0)]
+        one_by_one = geo_mod.match_one_at_a_time(line_tree(), riders, radius=5)
+        qt = line_tree()
+        batched = geo_mod.BatchDispatcher(qt, radius=5).match(riders)
+        assert sorted((r, d.id) for r, d, _ in batched) == [(0, 1), (1, 0)]
+        assert sum(dist for *_, dist in batched) < sum(dist for *_, dist in one_by_one)
+        assert not qt.index # Matched drivers leave the pool
+
+    def test_str_index_matches_quadtree_query(self):
+        qt, drivers = self.make_tree(n=1000)
+        index = geo_mod.STRIndex([d.id for d in drivers], [d.x for d in drivers], [d.y for d in drivers], leaf_size=16)
+        for box in [(0, 0, 100, 100), (10, 20, 30, 5), (50, 50, 0.5, 0.5), (200, 200, 10, 10)]:
+            assert sorted(index.query(box).tolist()) == sorted(d.id for d in qt.query(box))
+
+class TestGeohashIndex:
+    def test_encode_and_neighbours(self):
+        assert geohash_mod.encode(-5.6, 42.6, precision=5) == "ezs42"
+        assert sorted(geohash_mod.neighbours("ezs42")) == sorted(
+            ["ezs48", "ezs49", "ezs43", "ezs41", "ezs40", "ezefp", "ezefr", "ezefx"])
+
+    def test_radius_query_after_moves_matches_brute_force(self):
+        rng = random.Random(3)
+        index = geohash_mod.GeohashIndex(precision=6)
+        points = {}
+        for i in range(500):
+            points[i] = (rng.uniform(-122.5, -122.4), rng.uniform(37.7, 37.8))
+            index.insert(geo_mod.Driver(i, *points[i]))
+        for i in range(0, 500, 2):
+            points[i] = (rng.uniform(-122.5, -122.4), rng.uniform(37.7, 37.8))
+            index.update(i, *points[i])
+        assert index.remove(499) and not index.remove(499)
+        del points[499]
+        assert sum(len(ids) for ids in index.cells.values()) == len(points)
+
+        x, y, r = -122.45, 37.75, 0.02
+        expected = sorted(i for i, (px, py) in points.items() if (px - x) ** 2 + (py - y) ** 2 <= r * r)
+        assert sorted(index.query_radius(x, y, r)) == expected
+
+    def test_radius_query_wraps_the_antimeridian(self):
+        index = geohash_mod.GeohashIndex(precision=6)
+        index.insert(geo_mod.Driver("east", 179.995, 10.0))
+        index.insert(geo_mod.Driver("west", -179.995, 10.0))
+        index.insert(geo_mod.Driver("far", 179.9, 10.0))
+        assert "east" in index.nearby(-179.995, 10.0) # nearby() already wrapped
+        assert sorted(index.query_radius(-179.995, 10.0, 0.02)) == ["east", "west"]
+
+class TestLeaseLeaderElection:
+    def test_lease_is_exclusive_and_tokens_fence_old_leaders(self):
+        clock = scheduler_mod.ManualClock()
+        store = scheduler_mod.SQLiteLeaseStore(clock=clock)
+        a = scheduler_mod.LeaseManager(store, "leader", "A", ttl=2.0, clock=clock)
+        b = scheduler_mod.LeaseManager(store, "leader", "B", ttl=2.0, clock=clock)
+        assert a.try_acquire() and a.token == 1
+        assert not b.try_acquire()
+
+        clock.advance(1.0)
+        assert a.try_acquire() # Renewal pushes expiry to t=3
+        clock.advance(1.5)
+        assert not b.try_acquire()
+
+        clock.advance(1.0) # A stopped renewing
+        assert not a.is_leader()
+        assert b.try_acquire() and b.token == 2
+        assert not store.renew("leader", "A", 1, 2.0)
+        assert store.fence("job", b.token)
+        assert not store.fence("job", 1)
+
+    def test_background_renewal_outlives_ttl(self):
+        store = scheduler_mod.SQLiteLeaseStore()
+        leader = scheduler_mod.LeaseManager(store, "leader", "A", ttl=0.2)
+        rival = scheduler_mod.LeaseManager(store, "leader", "B", ttl=0.2)
+        leader.start(renew_every=0.05)
+        threading.Event().wait(0.4)
+        assert leader.is_leader() and leader.token == 1
+        assert not rival.try_acquire()
+        leader.stop()
+        assert rival.try_acquire()
+
+class TestTimingWheel:
+    def test_timers_fire_on_their_tick_across_cascades(self):
+        rng = random.Random(4)
+        wheel = scheduler_mod.TimingWheel(start_tick=3, slots=4, levels=3) # Span 64: forces cascades and parking
+        handles = [scheduler_mod.TimerHandle(rng.randint(0, 300), None) for _ in range(400)]
+        for h in handles:
+            wheel.add(h)
+        for h in handles[::5]:
+            assert wheel.remove(h)
+        cancelled = set(handles[::5])
+        for tick in range(3, 301):
+            due = wheel.advance(tick)
+            assert all(h not in cancelled for h in due)
+            assert all(max(h.expires, 3) == tick for h in due)
+        assert sum(1 for level in wheel.wheels for slot in level for _ in slot) == 0
+
+    def test_cron_parsing_and_next_time(self):
+        fields = scheduler_mod.parse_cron("*/15 9-17 * * 1-5")
+        assert fields[0] == [0, 15, 30, 45] and fields[4] == [1, 2, 3, 4, 5]
+        friday_evening = datetime(2024, 1, 5, 17, 50, tzinfo=timezone.utc).timestamp()
+        assert scheduler_mod.next_cron_time(fields, friday_evening) == \
+            datetime(2024, 1, 8, 9, 0, tzinfo=timezone.utc).timestamp() # Monday 09:00
+        with pytest.raises(ValueError):
+            scheduler_mod.parse_cron("61 * * * *")
+
+    def test_scheduler_rearms_cron_and_honours_cancel(self):
+        clock = scheduler_mod.ManualClock(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+        scheduler = scheduler_mod.TimingWheelScheduler(clock=clock, workers=2)
+        runs = []
+        cron = scheduler.schedule_cron("*/10 * * * *", lambda: runs.append("cron"))
+        once = scheduler.schedule_once(30, lambda: runs.append("once"))
+        dropped = scheduler.schedule_once(30, lambda: runs.append("dropped"))
+        assert scheduler.cancel(dropped)
+        for _ in range(30):
+            clock.advance(60)
+            for future in scheduler.run_pending():
+                future.result()
+        assert runs.count("cron") == 3 and runs.count("once") == 1 and "dropped" not in runs
+        scheduler.cancel(cron)
+        clock.advance(3600)
+        assert scheduler.run_pending() == []
+        scheduler.shutdown()
+
+    def test_missed_cron_slots_fire_once(self):
+        clock = scheduler_mod.ManualClock(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+        scheduler = scheduler_mod.TimingWheelScheduler(clock=clock, workers=2)
+        runs = []
+        scheduler.schedule_cron("0 12 * * *", lambda: runs.append("report"))
+        clock.advance(5 * 86400) # Nobody drained the wheel for 5 days
+        for _ in range(3):
+            for future in scheduler.run_pending():
+                future.result()
+        assert runs == ["report"]
+        clock.advance(86400)
+        for future in scheduler.run_pending():
+            future.result()
+        assert runs == ["report", "report"]
+        scheduler.shutdown()
+
+    def test_leader_fences_wheel_jobs(self):
+        clock = scheduler_mod.ManualClock()
+        store = scheduler_mod.SQLiteLeaseStore(clock=clock)
+        scheduler = scheduler_mod.TimingWheelScheduler(clock=clock, workers=1)
+        runs = []
+        scheduler.schedule_once(1, lambda: runs.append("report"), name="report")
+        node = scheduler_mod.ServerNode("L", store, ttl=60, clock=clock, scheduler=scheduler)
+        node.try_become_leader()
+        store.fence("report", node.lease.token + 1) # A newer leader already ran it
+        clock.advance(2)
+        for future in node.run_cron():
+            future.result()
+        assert runs == []
+        scheduler.shutdown()
+
+class TestPartitionedOwnership:
+    def test_only_the_changed_nodes_partitions_move(self):
+        ring = scheduler_mod.HashRing(vnodes=32)
+        for node in ("A", "B", "C"):
+            ring.add(node)
+        keys = [f"partition-{p}" for p in range(512)]
+        before = {k: ring.owner(k) for k in keys}
+        ring.add("D")
+        after_join = {k: ring.owner(k) for k in keys}
+        assert all(after_join[k] == "D" for k in keys if after_join[k] != before[k])
+        ring.remove("B")
+        after_leave = {k: ring.owner(k) for k in keys}
+        assert all(after_join[k] == "B" for k in keys if after_leave[k] != after_join[k])
+        assert "B" not in after_leave.values()
+
+    def test_membership_follows_heartbeats(self):
+        clock = scheduler_mod.ManualClock()
+        store = scheduler_mod.SQLiteLeaseStore(clock=clock)
+        a = scheduler_mod.PartitionedNode("A", store, timeout=5.0)
+        b = scheduler_mod.PartitionedNode("B", store, timeout=5.0)
+        a.heartbeat(); b.heartbeat()
+        assert a.refresh() == ({"A", "B"}, set())
+        jobs = [f"job-{i}" for i in range(200)]
+        assert 0 < sum(a.owns(j) for j in jobs) < 200
+        clock.advance(6)
+        a.heartbeat()
+        assert a.refresh() == (set(), {"B"})
+        assert all(a.owns(j) for j in jobs)
+
+class TestNotificationDispatcher:
+    def test_every_message_delivered_in_bounded_batches(self):
+        exchange = notify_mod.NotificationExchange(maxsize=8, verbose=False)
+        received, lock = {name: [] for name in exchange.queues}, threading.Lock()
+
+        def collector(name):
+            def send(batch):
+                assert 1 <= len(batch) <= 4
+                with lock:
+                    received[name].extend(batch)
+            return send
+
+        dispatcher = notify_mod.Dispatcher(exchange, {n: collector(n) for n in exchange.queues},
+                                           workers={"email": 3, "sms": 1, "push": 2}, batch_size=4)
+        dispatcher.start()
+        for i in range(100):
+            exchange.publish(i)
+        dispatcher.stop()
+        assert all(sorted(msgs) == list(range(100)) for msgs in received.values())
+        assert received["sms"] == list(range(100)) # A single worker keeps FIFO order
+
+    def test_full_queue_pushes_back_on_publish(self):
+        exchange = notify_mod.NotificationExchange(maxsize=2, verbose=False) # No workers running
+        exchange.publish("a")
+        exchange.publish("b")
+        with pytest.raises(queue.Full):
+            exchange.publish("c", timeout=0.01)
+
+    def test_partial_fan_out_reports_missed_channels(self):
+        exchange = notify_mod.NotificationExchange(maxsize=1, verbose=False)
+        assert exchange.publish("a") == ["email", "sms", "push"]
+        exchange.queues["sms"].get()
+        exchange.queues["email"].get()
+        with pytest.raises(notify_mod.PartialDelivery) as err:
+            exchange.publish("b", timeout=0.01)
+        assert err.value.delivered == ["email", "sms"] and err.value.missed == ["push"]
+        exchange.queues["push"].get()
+        assert exchange.publish_to(err.value.missed, "b") == ["push"]
+
+    def test_raising_sender_keeps_worker_alive(self):
+        exchange = notify_mod.NotificationExchange(channels=("sms",), maxsize=1, verbose=False)
+
+        def flaky(batch):
+            if batch[0] % 2:
+                raise ConnectionError("gateway down")
+
+        dispatcher = notify_mod.Dispatcher(exchange, {"sms": flaky}, workers=1, batch_size=1)
+        dispatcher.start()
+        for i in range(10):
+            exchange.publish(i)
+        dispatcher.stop() # Used to hang: the dead worker never freed the slot for _STOP
+        assert dispatcher.sent["sms"] == 5 and dispatcher.failed["sms"] == 5
+
+    def test_topic_router_wildcards(self):
+        router = notify_mod.TopicRouter()
+        router.subscribe("user.*.registered", "email")
+        router.subscribe("user.#", "audit")
+        router.subscribe("#.failed", "oncall")
+        router.subscribe("order.42.shipped", "sms")
+        assert router.match("user.7.registered") == {"email", "audit"}
+        assert router.match("user") == {"audit"} # '#' matches zero words
+        assert router.match("user.7.profile.updated") == {"audit"}
+        assert router.match("payment.9.failed") == {"oncall"}
+        assert router.match("order.42.shipped") == {"sms"}
+        assert router.match("order.43.shipped") == set()
+        assert router.unsubscribe("user.#", "audit") and not router.unsubscribe("user.#", "audit")
+        assert router.match("user.7.registered") == {"email"}
+
+    def test_topic_router_prunes_empty_branches(self):
+        router = notify_mod.TopicRouter()
+        router.subscribe("order.*.shipped", "email")
+        for i in range(100): # Per-entity subscriptions that come and go
+            router.subscribe(f"order.{i}.shipped", "sms")
+            router.unsubscribe(f"order.{i}.shipped", "sms")
+        assert set(router.root.children["order"].children) == {"*"}
+        assert router.unsubscribe("order.*.shipped", "email")
+        assert router.root.children == {}
+
+    def test_publish_with_topic_only_reaches_subscribed_channels(self):
+        exchange = notify_mod.NotificationExchange(verbose=False)
+        exchange.subscribe("user.*.registered", "email")
+        exchange.subscribe("order.*.shipped", "sms")
+        exchange.publish("hi", topic="user.1.registered")
+        exchange.publish("nobody listens", topic="user.1.deleted")
+        assert {name: q.qsize() for name, q in exchange.queues.items()} == {"email": 1, "sms": 0, "push": 0}
+
+    def test_spill_queue_is_fifo_across_segments(self, tmp_path):
+        spill = notify_mod.SpillQueue(str(tmp_path), memory_limit=10, segment_bytes=200, fsync_every=7, read_batch=4)
+        for i in range(50):
+            spill.put({"n": i})
+        assert len(spill.memory) == 10 and spill.on_disk == 40 and len(spill.segments) > 1
+        got = [spill.get()["n"] for _ in range(25)]
+        for i in range(50, 60): # Still spilling: new items queue up behind the disk backlog
+            spill.put({"n": i})
+        got += [spill.get_nowait()["n"] for _ in range(35)]
+        assert got == list(range(60))
+        assert spill.empty() and list(tmp_path.iterdir()) == []
+        with pytest.raises(notify_mod.queue.Empty):
+            spill.get(timeout=0.01)
+
+    def test_spill_queue_with_no_memory_goes_through_disk(self, tmp_path):
+        spill = notify_mod.SpillQueue(str(tmp_path), memory_limit=0)
+        for i in range(5):
+            spill.put(i)
+        assert spill.on_disk == 5
+        assert [spill.get(timeout=0.01) for _ in range(5)] == list(range(5))
+
+    def test_dispatcher_drains_spilled_exchange(self, tmp_path):
+        exchange = notify_mod.NotificationExchange(
+            verbose=False, queue_factory=lambda name: notify_mod.SpillQueue(str(tmp_path / name), memory_limit=5))
+        for i in range(40):
+            exchange.publish(i) # No workers yet: 35 per channel spill to disk
+        received = {name: [] for name in exchange.queues}
+        dispatcher = notify_mod.Dispatcher(exchange, {n: received[n].extend for n in exchange.queues},
+                                           workers=1, batch_size=8)
+        dispatcher.start()
+        dispatcher.stop() # Stop sentinels go to disk behind the backlog
+        assert all(msgs == list(range(40)) for msgs in received.values())